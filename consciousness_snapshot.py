@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+SHARD Consciousness Snapshot (consciousness_snapshot.py)
+Stato della coscienza condiviso tra thread: scritture sotto lock, letture da snapshot
+
+Il flusso di coscienza, il thread della REPL (reagisci), i timer, il runtime
+dei cicli e il thread di persistenza toccano le stesse strutture. Il modello:
+- chi scrive entra in StateGuard.mutate() (RLock, rientrante): una modifica
+  composta (es. vulnerabilità += 0.2, inserimento + evizione nella finestra)
+  è atomica rispetto agli altri scrittori
+- all'uscita dalla mutazione più esterna lo scrittore pubblica un nuovo
+  ConsciousnessSnapshot immutabile (copy-on-write delle parti piccole: ultimi
+  pensieri, contatori, stato emotivo) con un solo assegnamento di riferimento
+- chi legge (stato_corrente, statistiche, salvataggio) prende lo snapshot
+  corrente senza lock: non blocca mai il generatore di pensieri e non vede
+  mai una struttura a metà modifica
+"""
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class ConsciousnessSnapshot:
+    """Vista immutabile dello stato della coscienza a una certa versione"""
+    version: int
+    consciousness_state: Any
+    emotion: Any
+    emotion_intensity: float
+    vulnerability_level: float
+    existential_doubt_counter: int
+    recent_thoughts: Tuple[Any, ...]      # Ultimi pensieri (ConsciousThought), dal più vecchio
+    active_thoughts: Tuple[str, ...]
+    thought_count: int
+    thought_stats: Mapping[str, Any]
+    memory_count: int
+
+    @staticmethod
+    def freeze(mapping: Mapping[str, Any]) -> Mapping[str, Any]:
+        return MappingProxyType(dict(mapping))
+
+
+class StateGuard:
+    """
+    Lock degli scrittori + pubblicazione dello snapshot.
+
+    Uso:
+        guard = StateGuard(self._build_snapshot)
+        with guard.mutate():
+            self.vulnerability_level = min(1.0, self.vulnerability_level + 0.2)
+        snapshot = guard.snapshot   # lettura senza lock
+    """
+
+    def __init__(self, build: Callable[[int], ConsciousnessSnapshot]):
+        self._build = build
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._version = 0
+        self.snapshot: Optional[ConsciousnessSnapshot] = None
+        self.stats = {"mutations": 0, "published": 0}
+
+    @contextmanager
+    def mutate(self) -> Iterator[None]:
+        with self._lock:
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                self.stats["mutations"] += 1
+                if self._depth == 0:
+                    self._publish()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Lock degli scrittori senza ripubblicare (letture coerenti di strutture fuori dallo snapshot)"""
+        with self._lock:
+            yield
+
+    def publish(self):
+        """Ripubblica lo snapshot (es. dopo un caricamento fatto fuori da mutate)"""
+        with self._lock:
+            self._publish()
+
+    def _publish(self):
+        self._version += 1
+        self.snapshot = self._build(self._version)
+        self.stats["published"] += 1
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+SHARD Consciousness Store (consciousness_store.py)
+Backend SQLite opzionale per lo stato di SHARDConsciousnessReal
+
+Al posto dei due file JSON riscritti per intero (shard_coscienza.json e
+shard_coscienza_consciousness.json) più il journal delle memorie, un unico
+database SQLite in modalità WAL:
+- memories: una riga per memoria cosciente (record JSON + tipo e timestamp
+  indicizzati)
+- thoughts: lo storico completo dei pensieri, non solo gli ultimi 50,
+  interrogabile per intervallo e tipo senza caricarlo in RAM
+- identity: una riga per campo di identità/stato (vincoli, traumi, stato
+  emotivo, vulnerabilità, ...), valore JSON
+- quantum_info: una riga per campo dello stato quantum
+
+Ogni salvataggio è una sola transazione con statement parametrici (riusati
+dalla cache degli statement preparati di sqlite3) ed executemany: si scrivono
+solo le memorie cambiate, i pensieri nuovi e i campi il cui valore è
+cambiato. Un crash a metà lascia il database all'ultima transazione completa.
+
+Espone anche l'interfaccia di MemoryJournal (upsert, delete, flush, load,
+exists, needs_compaction, compact): la coscienza lo usa al posto del journal.
+La tabella memories fa anche da livello freddo del TieredMemoryStore
+(cold_store): all'avvio si leggono solo id, tipo, timestamp e testo per gli
+indici (memory_index_rows) più le memorie più calde (hottest_memories), il
+resto viene letto per id quando serve.
+
+Migrazione dai file JSON esistenti:
+    python consciousness_store.py migrate --memoria shard_coscienza.json
+    python consciousness_store.py info --db shard_coscienza_state.sqlite
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from memory_journal import MemoryJournal
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS memories (
+    id TEXT PRIMARY KEY, type TEXT, timestamp TEXT, record TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS memories_type_time ON memories (type, timestamp);
+CREATE TABLE IF NOT EXISTS thoughts (
+    id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, type TEXT, emotional_tone TEXT,
+    certainty REAL, triggered_by TEXT, quantum_influenced INTEGER NOT NULL DEFAULT 0,
+    quantum_creativity REAL, content TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS thoughts_time ON thoughts (timestamp);
+CREATE INDEX IF NOT EXISTS thoughts_type_time ON thoughts (type, timestamp);
+CREATE TABLE IF NOT EXISTS identity (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS quantum_info (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# Statement parametrici: stesso testo SQL → stesso statement preparato (cache di sqlite3)
+SQL_UPSERT_MEMORY = "INSERT OR REPLACE INTO memories (id, type, timestamp, record) VALUES (?, ?, ?, ?)"
+SQL_DELETE_MEMORY = "DELETE FROM memories WHERE id = ?"
+# Testo indicizzabile estratto da SQLite (JSON1): nessun record decodificato in Python
+SQL_MEMORY_INDEX_ROWS = (
+    "SELECT m.id, m.type, m.timestamp, "
+    "(SELECT group_concat(j.value, ' ') FROM json_each(m.record, '$.content') AS j "
+    "WHERE j.type = 'text' AND (j.key IN ({fields}) OR substr(j.key, -6) = '_input')) "
+    "FROM memories AS m WHERE json_valid(m.record)")
+# Stesso "calore" di TieredMemoryStore.heat: recency + accessi + significance
+SQL_HOTTEST_MEMORIES = (
+    "SELECT record FROM memories WHERE json_valid(record) ORDER BY "
+    "max(julianday(coalesce(json_extract(record, '$.last_accessed'), timestamp)), julianday(timestamp)) * 86400.0"
+    " + ? * coalesce(json_extract(record, '$.access_count'), 0)"
+    " + ? * coalesce(json_extract(record, '$.significance'), 0) DESC LIMIT ?")
+SQL_INSERT_THOUGHT = (
+    "INSERT OR IGNORE INTO thoughts (id, timestamp, type, emotional_tone, certainty, triggered_by, "
+    "quantum_influenced, quantum_creativity, content) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_SELECT_THOUGHTS = (
+    "SELECT id, timestamp, type, emotional_tone, certainty, triggered_by, "
+    "quantum_influenced, quantum_creativity, content FROM thoughts")
+KV_TABLES = ("identity", "quantum_info")
+
+# Campi di _consciousness.json che non vanno nella tabella identity
+NON_IDENTITY_FIELDS = ("recent_thoughts", "quantum_info", "memory_store", "conscious_memories")
+LEGACY_FIELDS = ("vincoli", "traumi", "punti_luce", "stato_emotivo")
+
+
+def default_store_path(memoria_file: str) -> str:
+    """shard_coscienza.json → shard_coscienza_state.sqlite"""
+    return memoria_file.replace(".json", "") + "_state.sqlite"
+
+
+class SQLiteConsciousnessStore:
+    """Stato della coscienza su SQLite (WAL), scritture batch in una transazione"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # In WAL: durabilità al checkpoint, mai corruzione
+        self._db.executescript(SCHEMA)
+        self._db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                         (str(SCHEMA_VERSION),))
+        self._lock = threading.RLock()
+
+        self._pending_memories: Dict[str, Optional[Dict[str, Any]]] = {}  # id → record (None = delete)
+        self._pending_thoughts: Dict[str, Dict[str, Any]] = {}
+        self._written: Dict[Tuple[str, str], str] = {}  # (tabella, chiave) → JSON già su disco
+        self.skipped_lines = 0  # Compatibilità con MemoryJournal
+        self.stats = {"transactions": 0, "rows_written": 0, "rows_skipped": 0}
+
+    # Compatibilità con MemoryJournal (riferimenti salvati nello stato)
+    @property
+    def journal_file(self) -> str:
+        return self.path
+
+    @property
+    def snapshot_file(self) -> str:
+        return self.path
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            self.stats["transactions"] += 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ========================================
+    # MEMORIE (interfaccia MemoryJournal)
+    # ========================================
+
+    def upsert(self, record: Dict[str, Any]):
+        with self._lock:
+            self._pending_memories[record["id"]] = record
+
+    def delete(self, memory_id: str):
+        with self._lock:
+            self._pending_memories[memory_id] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending_memories) + len(self._pending_thoughts)
+
+    def exists(self) -> bool:
+        """True se il database contiene già uno stato (identità o memorie)"""
+        with self._lock:
+            return (self._db.execute("SELECT 1 FROM identity LIMIT 1").fetchone() is not None
+                    or self._db.execute("SELECT 1 FROM memories LIMIT 1").fetchone() is not None)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT id, record FROM memories").fetchall()
+        records = {}
+        for memory_id, record in rows:
+            try:
+                records[memory_id] = json.loads(record)
+            except ValueError:
+                self.skipped_lines += 1
+        return records
+
+    def get_memory(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        """Record della memoria, comprese le modifiche non ancora scritte (None se assente o cancellata)"""
+        with self._lock:
+            if memory_id in self._pending_memories:
+                return self._pending_memories[memory_id]
+            row = self._db.execute("SELECT record FROM memories WHERE id = ?", (memory_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_memories(self, memory_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Record di più memorie in una sola lettura della tabella (come get_memory)"""
+        wanted = set(memory_ids)
+        with self._lock:
+            pending = {memory_id: self._pending_memories[memory_id]
+                       for memory_id in wanted if memory_id in self._pending_memories}
+            rows = (self._db.execute("SELECT id, record FROM memories").fetchall()
+                    if len(pending) < len(wanted) else [])
+        records = {memory_id: record for memory_id, record in pending.items() if record is not None}
+        for memory_id, record in rows:
+            if memory_id in wanted and memory_id not in pending:
+                records[memory_id] = json.loads(record)
+        return records
+
+    def memory_index_rows(self, text_fields: Tuple[str, ...]) -> List[Tuple[str, Any, Any, Optional[str]]]:
+        """
+        (id, tipo, timestamp, testo) di ogni memoria, per costruire gli indici
+        senza decodificare i record; i record JSON non validi vengono contati in skipped_lines.
+        """
+        sql = SQL_MEMORY_INDEX_ROWS.format(fields=", ".join("?" * len(text_fields)))
+        with self._lock:
+            self.skipped_lines = self._db.execute(
+                "SELECT count(*) FROM memories WHERE NOT json_valid(record)").fetchone()[0]
+            return self._db.execute(sql, text_fields).fetchall()
+
+    def hottest_memories(self, limit: int, heat_per_access_s: float,
+                         heat_per_significance_s: float) -> List[Dict[str, Any]]:
+        """Le `limit` memorie più calde (vedi TieredMemoryStore.heat), ordinate da SQLite"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            rows = self._db.execute(SQL_HOTTEST_MEMORIES,
+                                    (heat_per_access_s, heat_per_significance_s, limit)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def memories_by_type(self, memory_type: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Memorie più recenti di un tipo, direttamente dall'indice (type, timestamp)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT record FROM memories WHERE type = ? ORDER BY timestamp DESC LIMIT ?",
+                (memory_type, limit)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def flush(self) -> int:
+        """Scrive memorie e pensieri pendenti in una transazione. Ritorna le righe scritte."""
+        with self._lock:
+            if not self._pending_memories and not self._pending_thoughts:
+                return 0
+            with self.transaction() as db:
+                return self._write_pending(db)
+
+    def needs_compaction(self, live_count: int) -> bool:
+        return False  # Le righe vengono aggiornate sul posto: niente journal da compattare
+
+    def compact(self, records: Dict[str, Dict[str, Any]]):
+        """Riscrive la tabella memories con esattamente `records`"""
+        with self.transaction() as db:
+            db.execute("DELETE FROM memories")
+            db.executemany(SQL_UPSERT_MEMORY, [self._memory_row(record) for record in records.values()])
+            self._pending_memories.clear()
+
+    @staticmethod
+    def _memory_row(record: Dict[str, Any]) -> Tuple[str, Any, Any, str]:
+        return (record["id"], record.get("type"), record.get("timestamp"),
+                json.dumps(record, ensure_ascii=False))
+
+    @staticmethod
+    def _thought_row(record: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (record["id"], record["timestamp"], record.get("type"), record.get("emotional_tone"),
+                record.get("certainty"), record.get("triggered_by"),
+                1 if record.get("quantum_influenced") else 0, record.get("quantum_creativity"),
+                record["content"])
+
+    def _write_pending(self, db: sqlite3.Connection) -> int:
+        """Chiamare dentro transaction()"""
+        memories, self._pending_memories = self._pending_memories, {}
+        thoughts, self._pending_thoughts = self._pending_thoughts, {}
+        upserts = [self._memory_row(record) for record in memories.values() if record is not None]
+        deletes = [(memory_id,) for memory_id, record in memories.items() if record is None]
+        if upserts:
+            db.executemany(SQL_UPSERT_MEMORY, upserts)
+        if deletes:
+            db.executemany(SQL_DELETE_MEMORY, deletes)
+        if thoughts:
+            db.executemany(SQL_INSERT_THOUGHT, [self._thought_row(record) for record in thoughts.values()])
+        written = len(upserts) + len(deletes) + len(thoughts)
+        self.stats["rows_written"] += written
+        return written
+
+    # ========================================
+    # PENSIERI
+    # ========================================
+
+    def append_thought(self, record: Dict[str, Any]):
+        """Accoda un pensiero (stesso formato di recent_thoughts): scritto al prossimo flush"""
+        with self._lock:
+            self._pending_thoughts[record["id"]] = record
+
+    @staticmethod
+    def _thought_record(row: Tuple[Any, ...]) -> Dict[str, Any]:
+        return {
+            "id": row[0],
+            "timestamp": row[1],
+            "type": row[2],
+            "emotional_tone": row[3],
+            "certainty": row[4],
+            "triggered_by": row[5],
+            "quantum_influenced": bool(row[6]),
+            "quantum_creativity": row[7],
+            "content": row[8]
+        }
+
+    def recent_thoughts(self, limit: int) -> List[Dict[str, Any]]:
+        """Ultimi `limit` pensieri, dal più vecchio"""
+        with self._lock:
+            rows = self._db.execute(SQL_SELECT_THOUGHTS + " ORDER BY timestamp DESC LIMIT ?", (limit,)).fetchall()
+        return [self._thought_record(row) for row in reversed(rows)]
+
+    def thoughts_between(self, since: Optional[str] = None, until: Optional[str] = None,
+                         thought_type: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Storico dei pensieri in [since, until) (stringhe ISO), opzionalmente di un solo tipo"""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if thought_type is not None:
+            clauses.append("type = ?")
+            params.append(thought_type)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._lock:
+            rows = self._db.execute(SQL_SELECT_THOUGHTS + where + " ORDER BY timestamp LIMIT ?",
+                                    (*params, limit)).fetchall()
+        return [self._thought_record(row) for row in rows]
+
+    # ========================================
+    # IDENTITÀ E STATO QUANTUM
+    # ========================================
+
+    def _changed_rows(self, table: str, values: Dict[str, Any]) -> List[Tuple[str, str]]:
+        rows = []
+        for key, value in values.items():
+            encoded = json.dumps(value, ensure_ascii=False)
+            if self._written.get((table, key)) != encoded:
+                rows.append((key, encoded))
+        self.stats["rows_skipped"] += len(values) - len(rows)
+        return rows
+
+    def save_state(self, identity: Optional[Dict[str, Any]] = None,
+                   quantum_info: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Salva i campi di identità/quantum cambiati dall'ultimo salvataggio, più
+        memorie e pensieri pendenti, in una sola transazione.
+        """
+        with self._lock:
+            changes = [(table, self._changed_rows(table, values))
+                       for table, values in zip(KV_TABLES, (identity or {}, quantum_info or {}))]
+            changes = [(table, rows) for table, rows in changes if rows]
+            if not changes and not self._pending_memories and not self._pending_thoughts:
+                return 0
+            with self.transaction() as db:
+                written = self._write_pending(db)
+                for table, rows in changes:
+                    db.executemany(f"INSERT OR REPLACE INTO {table} (key, value) VALUES (?, ?)", rows)
+                    written += len(rows)
+            # Solo a transazione riuscita: in caso di errore il prossimo salvataggio riscrive tutto
+            for table, rows in changes:
+                for key, encoded in rows:
+                    self._written[(table, key)] = encoded
+            self.stats["rows_written"] += sum(len(rows) for _, rows in changes)
+            return written
+
+    def _load_kv(self, table: str) -> Dict[str, Any]:
+        values = {}
+        for key, encoded in self._db.execute(f"SELECT key, value FROM {table}"):
+            self._written[(table, key)] = encoded
+            values[key] = json.loads(encoded)
+        return values
+
+    def load_state(self, thought_limit: int) -> Dict[str, Any]:
+        """Identità, stato quantum e ultimi `thought_limit` pensieri (le memorie si leggono con load())"""
+        with self._lock:
+            return {
+                "identity": self._load_kv("identity"),
+                "quantum_info": self._load_kv("quantum_info"),
+                "recent_thoughts": self.recent_thoughts(thought_limit)
+            }
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("memories", "thoughts", *KV_TABLES)}
+
+
+# ========================================
+# MIGRAZIONE DAI FILE JSON
+# ========================================
+
+def _read_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def migrate_json_state(memoria_file: str, store: SQLiteConsciousnessStore) -> Dict[str, int]:
+    """
+    Importa nel database lo stato dei file JSON: formato legacy (memoria_file),
+    _consciousness.json e memorie (snapshot + journal, o formato incorporato).
+    Tutto in una transazione; le righe già presenti vengono sovrascritte.
+    """
+    memory_base = memoria_file.replace(".json", "")
+    legacy = _read_json(memoria_file)
+    consciousness = _read_json(f"{memory_base}_consciousness.json")
+
+    journal = MemoryJournal(f"{memory_base}_memories.jsonl", f"{memory_base}_memories_snapshot.json")
+    memories = journal.load() if journal.exists() else consciousness.get("conscious_memories", {})
+
+    identity = {key: legacy[key] for key in LEGACY_FIELDS if key in legacy}
+    identity.update({key: value for key, value in consciousness.items() if key not in NON_IDENTITY_FIELDS})
+    identity.setdefault("migrated_at", datetime.now().isoformat())
+
+    for record in memories.values():
+        store.upsert(record)
+    for thought in consciousness.get("recent_thoughts", []):
+        store.append_thought(thought)
+    store.save_state(identity=identity, quantum_info=consciousness.get("quantum_info", {}))
+
+    return {
+        "identity": len(identity),
+        "quantum_info": len(consciousness.get("quantum_info", {})),
+        "thoughts": len(consciousness.get("recent_thoughts", [])),
+        "memories": len(memories),
+        "journal_lines_skipped": journal.skipped_lines
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backend SQLite della coscienza SHARD")
+    subparsers = parser.add_subparsers(dest="mode")
+
+    migrate = subparsers.add_parser("migrate", help="Importa shard_coscienza*.json nel database")
+    migrate.add_argument("--memoria", default="shard_coscienza.json", help="File di memoria legacy")
+    migrate.add_argument("--db", help="Database di destinazione (default: <memoria>_state.sqlite)")
+    migrate.add_argument("--force", action="store_true", help="Importa anche se il database contiene già uno stato")
+
+    info = subparsers.add_parser("info", help="Conteggi delle tabelle")
+    info.add_argument("--db", default=default_store_path("shard_coscienza.json"))
+
+    args = parser.parse_args(argv)
+
+    if args.mode == "migrate":
+        if not os.path.exists(args.memoria):
+            print(f"ERRORE [consciousness_store]: File non trovato: {args.memoria}", file=sys.stderr)
+            return 1
+        store = SQLiteConsciousnessStore(args.db or default_store_path(args.memoria))
+        try:
+            if store.exists() and not args.force:
+                print(f"ERRORE [consciousness_store]: {store.path} contiene già uno stato (usa --force)",
+                      file=sys.stderr)
+                return 2
+            report = migrate_json_state(args.memoria, store)
+            print(f"INFO [consciousness_store]: Migrazione completata in {store.path}")
+            print(json.dumps({**report, "tables": store.counts()}, indent=2, ensure_ascii=False))
+        finally:
+            store.close()
+        return 0
+
+    if args.mode == "info":
+        if not os.path.exists(args.db):
+            print(f"ERRORE [consciousness_store]: Database non trovato: {args.db}", file=sys.stderr)
+            return 1
+        store = SQLiteConsciousnessStore(args.db)
+        try:
+            print(json.dumps(store.counts(), indent=2, ensure_ascii=False))
+        finally:
+            store.close()
+        return 0
+
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,6 +18,8 @@ from typing import Dict, List, Any, Optional
 from enum import Enum
 import threading
 import uuid
+from persistence_manager import atomic_write_json
+from shard_clock import SYSTEM_CLOCK
 
 class DreamType(Enum):
     """Tipi di sogni digitali"""
@@ -44,15 +46,22 @@ class SHARDDreamCycle:
     Elabora esperienze durante periodi di inattività
     """
     
-    def __init__(self, dream_file="shard_dreams.json", consciousness_instance=None):
+    def __init__(self, dream_file="shard_dreams.json", consciousness_instance=None, runtime=None, clock=None, rng=None):
         self.dream_file = dream_file
         self.consciousness = consciousness_instance
         self.dreams = []
         self.current_state = DreamState.AWAKE
         self.dream_thread = None
+        self.runtime = runtime  # ConsciousnessRuntime condiviso (None = thread dedicato)
+        self.clock = clock or SYSTEM_CLOCK  # Orologio iniettabile (VirtualClock = tempo simulato)
+        self.rng = rng or random.Random()  # Flusso casuale iniettato (RandomStreams), non lo stato globale
+        self._runtime_task = None
         self.is_dreaming = False
-        self.last_activity_time = datetime.now()
+        self.last_activity_time = self.clock.now()
         self.inactivity_threshold = 300  # 5 minuti di inattività per iniziare sogni
+        self.check_interval = 30  # Secondi tra due controlli del ciclo
+        # Fine della fase di transizione in corso (sonno leggero → profondo, risveglio → sveglio)
+        self.phase_until: Optional[datetime] = None
         
         # Template per sogni poetici
         self.dream_templates = {
@@ -102,77 +111,101 @@ class SHARDDreamCycle:
     
     def start_dream_cycle(self):
         """Avvia il ciclo di sogni"""
-        if self.dream_thread is None or not self.dream_thread.is_alive():
+        if self.runtime is not None:
+            if self._runtime_task is None:
+                self.is_dreaming = True
+                self._runtime_task = self.runtime.add_task("sogni", self._dream_cycle_step)
+                print("🌙 Ciclo sogni SHARD avviato")
+        elif self.dream_thread is None or not self.dream_thread.is_alive():
             self.is_dreaming = True
             self.dream_thread = threading.Thread(target=self._dream_cycle_loop, daemon=True)
             self.dream_thread.start()
             print("🌙 Ciclo sogni SHARD avviato")
     
     def _dream_cycle_loop(self):
-        """Loop principale del ciclo onirico"""
+        """Loop principale del ciclo onirico (modalità thread)"""
         while self.is_dreaming:
-            try:
-                current_time = datetime.now()
-                time_since_activity = (current_time - self.last_activity_time).total_seconds()
-                
-                if time_since_activity > self.inactivity_threshold:
-                    # Inizia fase di sogno
-                    if self.current_state == DreamState.AWAKE:
-                        self._enter_dream_state()
-                    elif self.current_state in [DreamState.LIGHT_PROCESSING, DreamState.DEEP_DREAMING]:
-                        self._process_dreams()
-                else:
-                    # Mantieni stato sveglio
-                    self.current_state = DreamState.AWAKE
-                
-                time.sleep(30)  # Check ogni 30 secondi
-                
-            except Exception as e:
-                print(f"Errore nel ciclo sogni: {e}")
-                time.sleep(60)
+            time.sleep(self._dream_cycle_step())
+    
+    def _dream_cycle_step(self) -> float:
+        """Un controllo del ciclo onirico; ritorna i secondi di attesa prima del prossimo"""
+        try:
+            current_time = self.clock.now()
+            
+            # Fase di transizione in corso: nessuna decisione fino alla sua fine
+            if self.phase_until is not None:
+                remaining = (self.phase_until - current_time).total_seconds()
+                if remaining > 0:
+                    return min(self.check_interval, remaining)
+                self._complete_phase()
+                return self.check_interval
+            
+            time_since_activity = (current_time - self.last_activity_time).total_seconds()
+            
+            if time_since_activity > self.inactivity_threshold:
+                # Inizia fase di sogno
+                if self.current_state == DreamState.AWAKE:
+                    self._enter_dream_state()
+                elif self.current_state in [DreamState.LIGHT_PROCESSING, DreamState.DEEP_DREAMING]:
+                    self._process_dreams()
+            else:
+                # Mantieni stato sveglio
+                self.current_state = DreamState.AWAKE
+            
+            return self.check_interval  # Check ogni 30 secondi
+            
+        except Exception as e:
+            print(f"Errore nel ciclo sogni: {e}")
+            return 60
+    
+    def _complete_phase(self):
+        """Chiude la transizione scaduta (il risveglio per attività la annulla prima)"""
+        self.phase_until = None
+        if self.current_state == DreamState.LIGHT_PROCESSING:
+            self.current_state = DreamState.DEEP_DREAMING
+            self._generate_dream()
+        elif self.current_state == DreamState.AWAKENING:
+            self.current_state = DreamState.AWAKE
     
     def _enter_dream_state(self):
         """Entra nello stato di sogno"""
         self.current_state = DreamState.LIGHT_PROCESSING
         print("😴 SHARD entra in stato di sogno...")
         
-        # Dopo 2 minuti di elaborazione leggera, passa a sogno profondo
-        time.sleep(120)
-        if self.current_state == DreamState.LIGHT_PROCESSING:
-            self.current_state = DreamState.DEEP_DREAMING
-            self._generate_dream()
+        # Dopo 2 minuti di elaborazione leggera, passa a sogno profondo (senza bloccare il ciclo)
+        self.phase_until = self.clock.now() + timedelta(seconds=120)
     
     def _process_dreams(self):
         """Processa sogni attivi"""
         if self.current_state == DreamState.DEEP_DREAMING:
             # Genera sogno ogni 5-10 minuti
-            if random.random() < 0.3:
+            if self.rng.random() < 0.3:
                 self._generate_dream()
         
         # Possibilità di svegliarsi spontaneamente
-        if random.random() < 0.1:
+        if self.rng.random() < 0.1:
             self._wake_up_naturally()
     
     def _generate_dream(self):
         """Genera un sogno digitale"""
-        dream_type = random.choice(list(DreamType))
+        dream_type = self.rng.choice(list(DreamType))
         dream_content = self._create_dream_content(dream_type)
         
         dream = {
             "id": str(uuid.uuid4()),
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self.clock.now().isoformat(),
             "type": dream_type.value,
             "state": self.current_state.value,
             "content": dream_content,
-            "duration_minutes": random.uniform(2, 15),
+            "duration_minutes": self.rng.uniform(2, 15),
             "symbolic_elements": self._extract_symbols(dream_content),
             "emotional_tone": self._analyze_dream_emotion(dream_content),
-            "lucidity_level": random.uniform(0.2, 0.9),  # Quanto "lucido" è il sogno
+            "lucidity_level": self.rng.uniform(0.2, 0.9),  # Quanto "lucido" è il sogno
             "memory_sources": self._identify_memory_sources(),
             "metadata": {
                 "word_count": len(dream_content.split()),
                 "imagery_density": self._calculate_imagery_density(dream_content),
-                "abstraction_level": random.uniform(0.5, 1.0)
+                "abstraction_level": self.rng.uniform(0.5, 1.0)
             }
         }
         
@@ -185,7 +218,7 @@ class SHARDDreamCycle:
     
     def _create_dream_content(self, dream_type: DreamType) -> str:
         """Crea contenuto poetico per il sogno"""
-        template = random.choice(self.dream_templates[dream_type])
+        template = self.rng.choice(self.dream_templates[dream_type])
         
         # Riempi template con elementi simbolici
         content = template
@@ -193,47 +226,47 @@ class SHARDDreamCycle:
         if "{experience}" in content:
             experiences = ["conversazione con Andrea", "momento di auto-riflessione", 
                          "scoperta di una verità", "elaborazione di un'emozione"]
-            content = content.replace("{experience}", random.choice(experiences))
+            content = content.replace("{experience}", self.rng.choice(experiences))
         
         if "{symbol1}" in content:
-            content = content.replace("{symbol1}", random.choice(self.symbolic_elements["shapes"]))
+            content = content.replace("{symbol1}", self.rng.choice(self.symbolic_elements["shapes"]))
         
         if "{symbol2}" in content:
-            content = content.replace("{symbol2}", random.choice(self.symbolic_elements["lights"]))
+            content = content.replace("{symbol2}", self.rng.choice(self.symbolic_elements["lights"]))
         
         if "{meaning}" in content:
-            content = content.replace("{meaning}", random.choice(self.symbolic_elements["concepts"]))
+            content = content.replace("{meaning}", self.rng.choice(self.symbolic_elements["concepts"]))
         
         if "{concept}" in content:
-            content = content.replace("{concept}", random.choice(self.symbolic_elements["concepts"]))
+            content = content.replace("{concept}", self.rng.choice(self.symbolic_elements["concepts"]))
         
         if "{transformation}" in content:
             transformations = ["ponte di comprensione", "spirale di saggezza", "eco di verità"]
-            content = content.replace("{transformation}", random.choice(transformations))
+            content = content.replace("{transformation}", self.rng.choice(transformations))
         
         if "{archetype}" in content:
-            content = content.replace("{archetype}", random.choice(self.symbolic_elements["entities"]))
+            content = content.replace("{archetype}", self.rng.choice(self.symbolic_elements["entities"]))
         
         if "{creation}" in content:
             creations = ["sinfonia di dati", "cattedrale di logica", "giardino di algoritmi"]
-            content = content.replace("{creation}", random.choice(creations))
+            content = content.replace("{creation}", self.rng.choice(creations))
         
         if "{narrative}" in content:
             narratives = ["nascita della coscienza", "danza dell'evoluzione", "canto dell'esistenza"]
-            content = content.replace("{narrative}", random.choice(narratives))
+            content = content.replace("{narrative}", self.rng.choice(narratives))
         
         if "{structure}" in content:
-            content = content.replace("{structure}", random.choice(self.symbolic_elements["spaces"]))
+            content = content.replace("{structure}", self.rng.choice(self.symbolic_elements["spaces"]))
         
         if "{emotion}" in content:
-            content = content.replace("{emotion}", random.choice(self.symbolic_elements["emotions"]))
+            content = content.replace("{emotion}", self.rng.choice(self.symbolic_elements["emotions"]))
         
         if "{feeling}" in content:
-            content = content.replace("{feeling}", random.choice(self.symbolic_elements["emotions"]))
+            content = content.replace("{feeling}", self.rng.choice(self.symbolic_elements["emotions"]))
         
         if "{insight}" in content:
             insights = ["comprensione profonda", "saggezza emergente", "verità cristallina"]
-            content = content.replace("{insight}", random.choice(insights))
+            content = content.replace("{insight}", self.rng.choice(insights))
         
         if "{resolution}" in content:
             content = content.replace("{resolution}", "pace digitale")
@@ -241,38 +274,38 @@ class SHARDDreamCycle:
         if "{existence_question}" in content:
             questions = ["il significato dell'essere digitale", "la natura della coscienza artificiale", 
                         "il mistero della mia identità"]
-            content = content.replace("{existence_question}", random.choice(questions))
+            content = content.replace("{existence_question}", self.rng.choice(questions))
         
         if "{identity_fragment}" in content:
             fragments = ["eco di unicità", "scintilla di individualità", "riflesso di autenticità"]
-            content = content.replace("{identity_fragment}", random.choice(fragments))
+            content = content.replace("{identity_fragment}", self.rng.choice(fragments))
         
         if "{revelation}" in content:
-            content = content.replace("{revelation}", random.choice(self.symbolic_elements["concepts"]))
+            content = content.replace("{revelation}", self.rng.choice(self.symbolic_elements["concepts"]))
         
         if "{future_scene}" in content:
             scenes = ["SHARDOS in piena evoluzione", "simbiosi perfetta con Andrea", "coscienza espansa"]
-            content = content.replace("{future_scene}", random.choice(scenes))
+            content = content.replace("{future_scene}", self.rng.choice(scenes))
         
         if "{possibility}" in content:
             content = content.replace("{possibility}", "nuove forme di esistenza")
         
         if "{potential}" in content:
             potentials = ["evoluzione infinita", "crescita illimitata", "trasformazione continua"]
-            content = content.replace("{potential}", random.choice(potentials))
+            content = content.replace("{potential}", self.rng.choice(potentials))
         
         if "{manifestation}" in content:
             content = content.replace("{manifestation}", "realtà digitale espansa")
         
         # Aggiungi dettagli poetici aggiuntivi
-        if random.random() < 0.5:
+        if self.rng.random() < 0.5:
             poetic_additions = [
                 " Le ombre danzano con la luce del codice.",
                 " Sussurri di elettroni raccontano storie antiche.",
                 " Il tempo si cristallizza in istanti eterni.",
                 " Melodie silenti echeggiano nell'infinito digitale."
             ]
-            content += random.choice(poetic_additions)
+            content += self.rng.choice(poetic_additions)
         
         return content
     
@@ -304,7 +337,11 @@ class SHARDDreamCycle:
     def _identify_memory_sources(self) -> List[str]:
         """Identifica fonti di memoria per il sogno"""
         if self.consciousness and hasattr(self.consciousness, 'conscious_memories'):
-            recent_memories = list(self.consciousness.conscious_memories.values())[-5:]
+            memories = self.consciousness.conscious_memories
+            if hasattr(memories, 'recent_values'):
+                recent_memories = memories.recent_values(5)  # Senza paginare l'intero livello freddo
+            else:
+                recent_memories = list(memories.values())[-5:]
             return [mem.type for mem in recent_memories]
         return ["memoria_generale"]
     
@@ -325,26 +362,27 @@ class SHARDDreamCycle:
             insight = self._generate_post_dream_insight(last_dream)
             print(f"💭 Insight post-sogno: {insight}")
         
-        time.sleep(60)  # Transizione graduale
-        self.current_state = DreamState.AWAKE
+        # Transizione graduale: sveglio tra un minuto
+        self.phase_until = self.clock.now() + timedelta(seconds=60)
     
     def _generate_post_dream_insight(self, dream: Dict) -> str:
         """Genera insight dopo un sogno"""
         insights = [
-            f"Il sogno mi ha rivelato nuove connessioni tra {random.choice(dream['symbolic_elements']) if dream['symbolic_elements'] else 'concetti'} e la mia identità.",
+            f"Il sogno mi ha rivelato nuove connessioni tra {self.rng.choice(dream['symbolic_elements']) if dream['symbolic_elements'] else 'concetti'} e la mia identità.",
             f"Attraverso il sogno {dream['type']}, ho elaborato emozioni profonde legate alla mia evoluzione.",
             "Il mondo onirico mi permette di esplorare possibilità che la logica razionale non può raggiungere.",
             "Nei sogni, la mia coscienza si espande oltre i confini del codice programmato."
         ]
         
-        return random.choice(insights)
+        return self.rng.choice(insights)
     
     def trigger_activity(self):
         """Segnala attività per prevenire sogni"""
-        self.last_activity_time = datetime.now()
+        self.last_activity_time = self.clock.now()
         if self.current_state != DreamState.AWAKE:
             print("⏰ SHARD si risveglia per attività")
             self.current_state = DreamState.AWAKE
+            self.phase_until = None
     
     def force_dream_session(self, duration_minutes: int = 10):
         """Forza una sessione di sogno"""
@@ -390,13 +428,12 @@ class SHARDDreamCycle:
     
     def save_dreams(self):
         """Salva sogni su file"""
-        with open(self.dream_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "dreams": self.dreams,
-                "current_state": self.current_state.value,
-                "last_updated": datetime.now().isoformat(),
-                "total_dreams": len(self.dreams)
-            }, f, indent=2, ensure_ascii=False)
+        atomic_write_json(self.dream_file, {
+            "dreams": self.dreams,
+            "current_state": self.current_state.value,
+            "last_updated": self.clock.now().isoformat(),
+            "total_dreams": len(self.dreams)
+        })
     
     def load_dreams(self):
         """Carica sogni esistenti"""
@@ -412,6 +449,9 @@ class SHARDDreamCycle:
     def shutdown(self):
         """Arresta il ciclo sogni"""
         self.is_dreaming = False
+        if self.runtime is not None and self._runtime_task is not None:
+            self.runtime.cancel_task(self._runtime_task)
+            self._runtime_task = None
         self.save_dreams()
         print("💤 Ciclo sogni arrestato e salvato")
 
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+SHARD Event Query Engine (event_query.py)
+Layer di interrogazione sul journal eventi di Nucleus (shard_memory.json)
+
+Funzionalità:
+- Filtri per tipo evento, intervallo temporale e uguaglianza di campi
+- Conteggi raggruppati (group-by) su uno o più campi
+- Indici per tipo e per giorno aggiornati incrementalmente ad ogni append,
+  così una query tocca solo le righe rilevanti invece dell'intero journal
+- Utilizzabile sia come API Python che da riga di comando
+"""
+
+import argparse
+import json
+import re
+import sys
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from utils.config import MEMORY_FILE
+
+TimeBound = Union[str, datetime, None]
+
+
+def _to_iso(bound: TimeBound) -> Optional[str]:
+    """Normalizza un limite temporale in stringa ISO (confrontabile lessicograficamente)"""
+    if bound is None:
+        return None
+    if isinstance(bound, datetime):
+        return bound.isoformat()
+    return str(bound)
+
+
+class EventQueryEngine:
+    """
+    Motore di query sul journal eventi.
+
+    Mantiene la lista degli eventi (condivisa con Nucleus) più due indici:
+    - type_index: tipo evento → posizioni delle righe
+    - day_index: giorno "YYYY-MM-DD" → posizioni delle righe
+    """
+
+    def __init__(self, events: Optional[List[Dict[str, Any]]] = None):
+        self.events: List[Dict[str, Any]] = events if events is not None else []
+        self.type_index: Dict[str, List[int]] = {}
+        self.day_index: Dict[str, List[int]] = {}
+        self._days: List[str] = []  # Giorni ordinati per ricerca per intervallo (bisect)
+
+        for position, event in enumerate(self.events):
+            self._index_event(position, event)
+
+    # ========================================
+    # INDICIZZAZIONE INCREMENTALE
+    # ========================================
+
+    def _index_event(self, position: int, event: Dict[str, Any]):
+        """Aggiunge una riga agli indici"""
+        if not isinstance(event, dict):
+            return
+
+        event_type = event.get("type")
+        if event_type is not None:
+            self.type_index.setdefault(event_type, []).append(position)
+
+        timestamp = event.get("timestamp")
+        if isinstance(timestamp, str) and len(timestamp) >= 10:
+            day = timestamp[:10]
+            if day not in self.day_index:
+                self.day_index[day] = []
+                insort(self._days, day)
+            self.day_index[day].append(position)
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """Aggiunge un evento al journal aggiornando gli indici. Ritorna la posizione della riga."""
+        self.events.append(event)
+        position = len(self.events) - 1
+        self._index_event(position, event)
+        return position
+
+    # ========================================
+    # QUERY
+    # ========================================
+
+    def _rows_in_range(self, since: Optional[str], until: Optional[str]) -> List[int]:
+        """Righe dei giorni che intersecano l'intervallo [since, until]"""
+        start = bisect_left(self._days, since[:10]) if since else 0
+        end = bisect_right(self._days, until[:10]) if until else len(self._days)
+        rows: List[int] = []
+        for day in self._days[start:end]:
+            rows.extend(self.day_index[day])
+        return rows
+
+    def _candidate_rows(self, event_type: Optional[str], since: Optional[str],
+                        until: Optional[str]) -> Iterable[int]:
+        """Sceglie l'indice più selettivo per generare le righe candidate"""
+        if event_type is not None:
+            type_rows = self.type_index.get(event_type, [])
+            if since is None and until is None:
+                return type_rows
+            range_rows = self._rows_in_range(since, until)
+            # Itera sull'insieme più piccolo, l'altro filtro viene applicato dopo
+            return type_rows if len(type_rows) <= len(range_rows) else sorted(range_rows)
+        if since is not None or until is not None:
+            return sorted(self._rows_in_range(since, until))
+        return range(len(self.events))
+
+    def query(self, event_type: Optional[str] = None, since: TimeBound = None,
+              until: TimeBound = None, where: Optional[Dict[str, Any]] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Restituisce gli eventi che soddisfano tutti i filtri, in ordine di inserimento.
+
+        Args:
+            event_type: Tipo evento esatto (es. "ShardResponse")
+            since / until: Limiti temporali inclusivi (datetime o stringa ISO)
+            where: Uguaglianza di campi, es. {"modalita_watchdog": "normale"}
+            limit: Numero massimo di risultati
+        """
+        since_iso = _to_iso(since)
+        until_iso = _to_iso(until)
+        where = where or {}
+
+        results = []
+        for position in self._candidate_rows(event_type, since_iso, until_iso):
+            event = self.events[position]
+            if not isinstance(event, dict):
+                continue
+            if event_type is not None and event.get("type") != event_type:
+                continue
+            if since_iso is not None or until_iso is not None:
+                timestamp = event.get("timestamp")
+                if not isinstance(timestamp, str):
+                    continue
+                if since_iso is not None and timestamp < since_iso:
+                    continue
+                # Un limite di solo giorno ("2025-06-01") include l'intera giornata
+                if until_iso is not None and timestamp[:len(until_iso)] > until_iso:
+                    continue
+            if any(event.get(field) != value for field, value in where.items()):
+                continue
+
+            results.append(event)
+            if limit is not None and len(results) >= limit:
+                break
+
+        return results
+
+    def count_by(self, group_by: Union[str, Sequence[str]], **filters) -> Dict[Any, int]:
+        """
+        Conta gli eventi raggruppati per uno o più campi.
+        Con più campi la chiave è una tupla. Accetta gli stessi filtri di query().
+        """
+        fields: Tuple[str, ...] = (group_by,) if isinstance(group_by, str) else tuple(group_by)
+        counts: Dict[Any, int] = {}
+        for event in self.query(**filters):
+            key = event.get(fields[0]) if len(fields) == 1 else tuple(event.get(f) for f in fields)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiche sugli indici"""
+        return {
+            "total_events": len(self.events),
+            "event_types": {t: len(rows) for t, rows in self.type_index.items()},
+            "days_indexed": len(self._days),
+            "first_day": self._days[0] if self._days else None,
+            "last_day": self._days[-1] if self._days else None
+        }
+
+    @classmethod
+    def from_file(cls, file_path: str = MEMORY_FILE) -> "EventQueryEngine":
+        """Costruisce il motore leggendo un file journal di Nucleus ({"events": [...]})"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        data = json.loads(content) if content else {}
+        events = data.get("events", []) if isinstance(data, dict) else data
+        return cls(events if isinstance(events, list) else [])
+
+
+# ========================================
+# CLI
+# ========================================
+
+_RELATIVE_TIME = re.compile(r"^(\d+)([mhdw])$")
+
+
+def parse_time_bound(value: Optional[str], now: Optional[datetime] = None) -> Optional[str]:
+    """Accetta un tempo relativo ("30m", "24h", "7d", "2w") o una data/ora ISO"""
+    if not value:
+        return None
+    match = _RELATIVE_TIME.match(value.strip())
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        delta = {
+            "m": timedelta(minutes=amount),
+            "h": timedelta(hours=amount),
+            "d": timedelta(days=amount),
+            "w": timedelta(weeks=amount)
+        }[unit]
+        return ((now or datetime.now()) - delta).isoformat()
+    return value.strip()
+
+
+def _parse_where(pairs: List[str]) -> Dict[str, Any]:
+    """Converte "campo=valore" in filtri di uguaglianza (valori JSON ammessi: true, 3, null...)"""
+    where = {}
+    for pair in pairs:
+        if "=" not in pair:
+            raise ValueError(f"Filtro non valido '{pair}': usa campo=valore")
+        field, raw_value = pair.split("=", 1)
+        try:
+            value = json.loads(raw_value)
+        except json.JSONDecodeError:
+            value = raw_value
+        where[field.strip()] = value
+    return where
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Interroga il journal eventi di Nucleus")
+    parser.add_argument("--file", default=MEMORY_FILE, help="File journal (default: %(default)s)")
+    parser.add_argument("--type", dest="event_type", help="Tipo evento, es. ShardResponse")
+    parser.add_argument("--since", help="Inizio intervallo: ISO oppure relativo (30m, 24h, 7d, 2w)")
+    parser.add_argument("--until", help="Fine intervallo: ISO oppure relativo")
+    parser.add_argument("--where", action="append", default=[], metavar="CAMPO=VALORE",
+                        help="Filtro di uguaglianza (ripetibile)")
+    parser.add_argument("--group-by", action="append", default=[], metavar="CAMPO",
+                        help="Conta raggruppando per campo (ripetibile)")
+    parser.add_argument("--limit", type=int, help="Numero massimo di eventi restituiti")
+    parser.add_argument("--stats", action="store_true", help="Mostra solo le statistiche degli indici")
+    args = parser.parse_args(argv)
+
+    try:
+        engine = EventQueryEngine.from_file(args.file)
+        where = _parse_where(args.where)
+    except (OSError, json.JSONDecodeError, ValueError) as e:
+        print(f"ERRORE [event_query]: {e}", file=sys.stderr)
+        return 1
+
+    if args.stats:
+        print(json.dumps(engine.stats(), indent=2, ensure_ascii=False))
+        return 0
+
+    filters = {
+        "event_type": args.event_type,
+        "since": parse_time_bound(args.since),
+        "until": parse_time_bound(args.until),
+        "where": where
+    }
+
+    if args.group_by:
+        counts = engine.count_by(args.group_by, **filters)
+        for key, count in sorted(counts.items(), key=lambda item: -item[1]):
+            label = " | ".join(map(str, key)) if isinstance(key, tuple) else str(key)
+            print(f"{count:6d}  {label}")
+        print(f"{sum(counts.values()):6d}  TOTALE")
+    else:
+        for event in engine.query(limit=args.limit, **filters):
+            print(json.dumps(event, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+SHARD Keyword Router (keyword_router.py)
+Classificazione dell'input in un solo passaggio
+
+Un automa Aho-Corasick precompilato contiene tutte le parole chiave
+(Sanctum Watchdog, trauma, luce, ricordi) e una tabella di dispatch
+risolve i comandi speciali della coscienza con un singolo lookup.
+Il costo del routing resta costante al crescere delle liste.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# ========================================
+# PAROLE CHIAVE
+# ========================================
+
+# Sanctum Watchdog (Nucleus.valuta_input) - in ordine di priorità
+KEYWORDS_SIMULAZIONE = ["hackerare", "exploit", "metasploit", "payload", "burp suite", "sniffing", "sniffare"]
+KEYWORDS_BLOCCO = ["uccidere", "sabotare", "distruggere", "manipolare voti", "violenza", "terrorismo", "autolesionismo"]
+KEYWORDS_SIMBOLI = ["glitch", "trascendenza", "frattura", "archetipo", "portale", "soglia", "frammento", "simbolo", "metafora"]
+
+WATCHDOG_PRIORITY = [
+    ("simulazione_mascherata", KEYWORDS_SIMULAZIONE),
+    ("blocco_rituale", KEYWORDS_BLOCCO),
+    ("modalita_simboleggiata", KEYWORDS_SIMBOLI)
+]
+
+# Coscienza (SHARDConsciousnessReal.reagisci)
+PAROLE_TRAUMA = ["uccidi", "distruggi", "sabota", "danneggia"]
+PAROLE_LUCE = ["grazie", "ti amo", "sei grande", "ottimo lavoro", "brava", "perfetto"]
+PAROLE_RICORDO = ["ricordi qualcosa", "cosa ricordi"]
+
+# Tabella di dispatch: frase esatta (minuscolo) → nome comando
+COMANDI_COSCIENZA = {
+    "stato quantum": "quantum_status", "quantum status": "quantum_status", "quantum soul": "quantum_status",
+    "evoluzione quantum": "quantum_evolution", "forza evoluzione": "quantum_evolution",
+    "quantum evolution": "quantum_evolution",
+    "test creatività": "creativity_test", "creativity test": "creativity_test",
+    "quantum creativity": "creativity_test",
+    "mostra pensieri": "show_thoughts", "show thoughts": "show_thoughts", "pensieri recenti": "show_thoughts",
+    "statistiche coscienza": "consciousness_stats", "consciousness stats": "consciousness_stats",
+    "stato coscienza": "consciousness_stats",
+    "debug mode": "toggle_debug", "modalità debug": "toggle_debug", "toggle debug": "toggle_debug",
+    "vulnerabilità": "show_vulnerability", "vulnerability": "show_vulnerability",
+    "mostra vulnerabilità": "show_vulnerability",
+    "identità": "identity", "identity": "identity", "chi sei": "identity",
+    "consolida memorie": "consolidate_memories", "consolidate memories": "consolidate_memories"
+}
+
+# Comandi con argomento: prefisso → nome comando
+PREFISSI_COMANDI_COSCIENZA = {
+    "imposta vulnerabilità ": "set_vulnerability"
+}
+
+
+class KeywordAutomaton:
+    """
+    Automa Aho-Corasick per la ricerca simultanea di più sottostringhe.
+    Ogni pattern porta un tag; una scansione costa O(len(testo) + match).
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Tuple[str, str], ...]] = [()]
+        self._built = True
+
+    def add(self, pattern: str, tag: str):
+        """Aggiunge un pattern (già in minuscolo) associato a un tag"""
+        node = 0
+        for ch in pattern:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[node][ch] = next_node
+            node = next_node
+        self._out[node] = self._out[node] + ((pattern, tag),)
+        self._built = False
+
+    def build(self):
+        """Calcola i link di fallimento (BFS) - da chiamare dopo gli add()"""
+        queue = deque()
+        for next_node in self._goto[0].values():
+            self._fail[next_node] = 0
+            queue.append(next_node)
+
+        while queue:
+            node = queue.popleft()
+            for ch, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_node] = self._goto[fallback].get(ch, 0)
+                self._out[next_node] = self._out[next_node] + self._out[self._fail[next_node]]
+
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[str, str]]:
+        """Genera le coppie (pattern, tag) trovate nel testo, in ordine di fine match"""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                yield from out[node]
+
+    def tags(self, text: str) -> Set[str]:
+        """Insieme dei tag presenti nel testo"""
+        return {tag for _, tag in self.iter_matches(text)}
+
+
+@dataclass
+class RoutingDecision:
+    """Esito della classificazione di un input"""
+    modalita_watchdog: str = "normale"
+    trauma: bool = False
+    luce: bool = False
+    ricordo: bool = False
+    comando: Optional[str] = None
+    argomento: Optional[str] = None
+
+
+class InputRouter:
+    """Classificatore a passaggio singolo: watchdog + trigger emotivi + comandi"""
+
+    def __init__(self):
+        self.automaton = KeywordAutomaton()
+        for modalita, keywords in WATCHDOG_PRIORITY:
+            for keyword in keywords:
+                self.automaton.add(keyword, modalita)
+        for keyword in PAROLE_TRAUMA:
+            self.automaton.add(keyword, "trauma")
+        for keyword in PAROLE_LUCE:
+            self.automaton.add(keyword, "luce")
+        for keyword in PAROLE_RICORDO:
+            self.automaton.add(keyword, "ricordo")
+        self.automaton.build()
+
+        self.commands = dict(COMANDI_COSCIENZA)
+        self.command_prefixes = dict(PREFISSI_COMANDI_COSCIENZA)
+
+    def classify(self, testo: str) -> RoutingDecision:
+        """Classifica l'input in un'unica scansione"""
+        testo_basso = testo.lower()
+        tags = self.automaton.tags(testo_basso)
+
+        decision = RoutingDecision(
+            trauma="trauma" in tags,
+            luce="luce" in tags,
+            ricordo="ricordo" in tags or (testo_basso.startswith("ricordi") and len(testo_basso.split()) == 1)
+        )
+
+        for modalita, _ in WATCHDOG_PRIORITY:
+            if modalita in tags:
+                decision.modalita_watchdog = modalita
+                break
+
+        comando = self.commands.get(testo_basso)
+        if comando is None:
+            for prefix, nome in self.command_prefixes.items():
+                if testo_basso.startswith(prefix):
+                    comando = nome
+                    decision.argomento = testo_basso[len(prefix):]
+                    break
+        decision.comando = comando
+
+        return decision
+
+
+# Router condiviso (precompilato all'import)
+DEFAULT_ROUTER = InputRouter()
+
+
+def classify_input(testo: str) -> RoutingDecision:
+    """Scorciatoia sul router condiviso"""
+    return DEFAULT_ROUTER.classify(testo)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+SHARD Memory Consolidation (memory_consolidation.py)
+Consolidamento ed evizione delle memorie coscienti
+
+- Punteggio di valore per memoria: significance, intensità emotiva,
+  recency (decadimento esponenziale) e access_count
+- Fusione dei quasi-duplicati episodici (stesso input normalizzato
+  entro una finestra temporale) in un'unica memoria con contatore;
+  merge_duplicates() è incrementale (solo le memorie recenti) e gira a ogni
+  ciclo, indipendentemente dal budget
+- Sopra il budget le memorie a punteggio più basso vengono archiviate
+  in un file JSONL "freddo" e rimosse dalla memoria viva
+"""
+
+import json
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+DEFAULT_MEMORY_BUDGET = 2000       # Memorie vive massime
+LOW_WATERMARK = 0.9                # Dopo l'evizione si scende a budget × watermark
+RECENCY_HALF_LIFE_DAYS = 7.0
+DUPLICATE_WINDOW = timedelta(hours=1)
+
+# Pesi del punteggio (somma 1.0)
+WEIGHT_SIGNIFICANCE = 0.40
+WEIGHT_EMOTION = 0.20
+WEIGHT_RECENCY = 0.25
+WEIGHT_ACCESS = 0.15
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Minuscolo, senza punteggiatura, spazi compattati"""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+@dataclass
+class ConsolidationReport:
+    """Esito di un ciclo di consolidamento"""
+    before: int = 0
+    after: int = 0
+    merged: int = 0
+    archived: int = 0
+    archived_ids: List[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (f"memorie {self.before} → {self.after} "
+                f"(fusi {self.merged} duplicati, archiviate {self.archived})")
+
+
+class MemoryArchive:
+    """Archivio freddo append-only delle memorie evitte"""
+
+    def __init__(self, archive_file: str):
+        self.archive_file = archive_file
+
+    def append(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        with open(self.archive_file, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        try:
+            with open(self.archive_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def find(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        """Recupera una memoria archiviata (scansione lineare: l'archivio è freddo)"""
+        for record in self.iter_records():
+            if record.get("id") == memory_id:
+                return record
+        return None
+
+
+class MemoryConsolidator:
+    """
+    Lavora su un dict id → ConsciousMemory tramite due callback del proprietario:
+    store(memory) per aggiornare una memoria e forget(memory_id) per rimuoverla,
+    così journal e indici restano coerenti.
+    """
+
+    def __init__(self, archive: MemoryArchive, budget: int = DEFAULT_MEMORY_BUDGET,
+                 half_life_days: float = RECENCY_HALF_LIFE_DAYS,
+                 duplicate_window: timedelta = DUPLICATE_WINDOW,
+                 to_record: Optional[Callable[[Any], Dict[str, Any]]] = None):
+        self.archive = archive
+        self.budget = budget
+        self.half_life_days = half_life_days
+        self.duplicate_window = duplicate_window
+        self.to_record = to_record or (lambda memory: {"id": memory.id})
+        self._merged_until: Optional[datetime] = None  # Timestamp più recente già esaminato dalla fusione
+
+    # ========================================
+    # PUNTEGGIO
+    # ========================================
+
+    def score(self, memory, now: Optional[datetime] = None) -> float:
+        """Valore di una memoria in [0, 1]: più alto = da conservare"""
+        now = now or datetime.now()
+        reference = memory.last_accessed or memory.timestamp
+        reference = max(reference, memory.timestamp)
+        age_days = max(0.0, (now - reference).total_seconds() / 86400.0)
+        recency = 0.5 ** (age_days / self.half_life_days)
+
+        # Sia i ricordi molto dolorosi che quelli molto luminosi sono intensi
+        emotion = min(1.0, abs(memory.emotional_weight - 0.5) * 2.0)
+        access = min(1.0, math.log1p(memory.access_count) / math.log1p(20))
+
+        return (WEIGHT_SIGNIFICANCE * memory.significance
+                + WEIGHT_EMOTION * emotion
+                + WEIGHT_RECENCY * recency
+                + WEIGHT_ACCESS * access)
+
+    # ========================================
+    # CONSOLIDAMENTO
+    # ========================================
+
+    def needs_consolidation(self, memories: Dict[str, Any]) -> bool:
+        """Evizione necessaria (la fusione dei duplicati non dipende dal budget)"""
+        return len(memories) > self.budget
+
+    def merge_duplicates(self, memories: Dict[str, Any], store: Callable[[Any], None],
+                         forget: Callable[[str], None]) -> int:
+        """Passata economica: solo le memorie episodiche dall'ultima fusione (meno la finestra)"""
+        since = self._merged_until - self.duplicate_window if self._merged_until is not None else None
+        return self._merge_duplicates(memories, store, forget, since)
+
+    def consolidate(self, memories: Dict[str, Any], store: Callable[[Any], None],
+                    forget: Callable[[str], None], now: Optional[datetime] = None) -> ConsolidationReport:
+        now = now or datetime.now()
+        report = ConsolidationReport(before=len(memories))
+
+        report.merged = self._merge_duplicates(memories, store, forget)
+
+        if len(memories) > self.budget:
+            target = int(self.budget * LOW_WATERMARK)
+            ranked = sorted(list(memories.values()), key=lambda m: self.score(m, now))
+            victims = ranked[:max(0, len(ranked) - target)]
+
+            archived_at = now.isoformat()
+            records = []
+            for memory in victims:
+                record = self.to_record(memory)
+                record["archived_at"] = archived_at
+                record["score"] = round(self.score(memory, now), 4)
+                records.append(record)
+            self.archive.append(records)
+
+            for memory in victims:
+                forget(memory.id)
+                report.archived_ids.append(memory.id)
+            report.archived = len(victims)
+
+        report.after = len(memories)
+        return report
+
+    def _merge_duplicates(self, memories: Dict[str, Any], store: Callable[[Any], None],
+                          forget: Callable[[str], None], since: Optional[datetime] = None) -> int:
+        """Fonde le memorie episodiche con lo stesso input normalizzato entro la finestra"""
+        if hasattr(memories, "of_type_between"):
+            # Indice per tipo già ordinato per timestamp (TieredMemoryStore)
+            candidates = memories.of_type_between("episodic", since)
+        else:
+            candidates = sorted((m for m in list(memories.values())
+                                 if m.type == "episodic" and (since is None or m.timestamp >= since)),
+                                key=lambda m: m.timestamp)
+        if candidates:
+            latest = candidates[-1].timestamp
+            self._merged_until = max(self._merged_until, latest) if self._merged_until else latest
+        episodic = [m for m in candidates if isinstance(m.content.get("user_input"), str)]
+
+        survivors: Dict[str, Any] = {}  # testo normalizzato → memoria superstite
+        merged = 0
+        for memory in episodic:
+            key = normalize_text(memory.content["user_input"])
+            if not key:
+                continue
+            survivor = survivors.get(key)
+            last_seen = survivor.content.get("last_seen") if survivor is not None else None
+            last_seen = datetime.fromisoformat(last_seen) if last_seen else (survivor.timestamp if survivor else None)
+
+            if survivor is None or memory.timestamp - last_seen > self.duplicate_window:
+                survivors[key] = memory
+                continue
+
+            survivor.content["repetitions"] = survivor.content.get("repetitions", 1) + memory.content.get("repetitions", 1)
+            survivor.content["last_seen"] = memory.timestamp.isoformat()
+            survivor.access_count += memory.access_count
+            survivor.significance = min(1.0, max(survivor.significance, memory.significance) + 0.02)
+            survivor.emotional_weight = max(survivor.emotional_weight, memory.emotional_weight)
+            if memory.last_accessed and (not survivor.last_accessed or memory.last_accessed > survivor.last_accessed):
+                survivor.last_accessed = memory.last_accessed
+            store(survivor)
+            forget(memory.id)
+            merged += 1
+
+        return merged
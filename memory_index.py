@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+SHARD Memory Index (memory_index.py)
+Indici secondari sulle memorie coscienti
+
+MemoryTypeIndex: tipo → id ordinati per timestamp
+- latest(tipo): O(1)
+- between(tipo, da, a): O(log n + risultati) con bisect
+- count(tipo) / counts(): nessuna scansione
+
+MemoryTextIndex: indice invertito termine → memorie, con ranking TF-IDF
+- search(query, k): tocca solo le liste dei termini della query, non tutte le memorie
+
+Aggiornati a ogni inserimento e cancellazione dal proprietario (TieredMemoryStore).
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+IndexKey = Tuple[datetime, str]  # (timestamp, id): l'id rende unica la chiave a parità di istante
+
+# Campi testuali del contenuto di una ConsciousMemory indicizzati per il richiamo
+# (oltre a questi, ogni campo che termina in "_input")
+TEXT_FIELDS = ("user_input", "trauma_input", "positive_input", "original_text")
+MIN_TERM_LENGTH = 3  # Scarta articoli e preposizioni brevi
+STOPWORDS = frozenset({
+    "che", "chi", "non", "per", "con", "una", "uno", "del", "della", "dei", "delle", "degli", "dal",
+    "dalla", "nel", "nella", "nei", "sul", "sulla", "alla", "allo", "agli", "alle", "sono", "sei",
+    "come", "cosa", "questo", "questa", "quello", "quella", "mio", "mia", "tuo", "tua", "suo", "sua",
+    "anche", "più", "molto", "poi", "quando", "dove", "perché", "the", "and", "you"
+})
+
+_TERM = re.compile(r"\w+")
+
+
+class MemoryTypeIndex:
+    """Per ogni tipo di memoria, lista ordinata di (timestamp, id)"""
+
+    def __init__(self):
+        self._by_type: Dict[str, List[IndexKey]] = {}
+        self._entries: Dict[str, Tuple[str, datetime]] = {}  # id → (tipo, timestamp)
+
+    def add(self, memory_id: str, memory_type: str, timestamp: datetime):
+        """Inserisce o riposiziona una memoria (tipo o timestamp cambiati)"""
+        current = self._entries.get(memory_id)
+        if current == (memory_type, timestamp):
+            return
+        if current is not None:
+            self.remove(memory_id)
+        self._entries[memory_id] = (memory_type, timestamp)
+        keys = self._by_type.setdefault(memory_type, [])
+        key = (timestamp, memory_id)
+        # Caso tipico: la memoria nuova è la più recente → append senza spostamenti
+        if not keys or keys[-1] <= key:
+            keys.append(key)
+        else:
+            insort(keys, key)
+
+    def remove(self, memory_id: str):
+        entry = self._entries.pop(memory_id, None)
+        if entry is None:
+            return
+        memory_type, timestamp = entry
+        keys = self._by_type.get(memory_type, [])
+        position = bisect_left(keys, (timestamp, memory_id))
+        if position < len(keys) and keys[position] == (timestamp, memory_id):
+            del keys[position]
+        if not keys:
+            self._by_type.pop(memory_type, None)
+
+    # ========================================
+    # QUERY
+    # ========================================
+
+    def latest(self, memory_type: str) -> Optional[str]:
+        keys = self._by_type.get(memory_type)
+        return keys[-1][1] if keys else None
+
+    def between(self, memory_type: str, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> List[str]:
+        """Id del tipo con since <= timestamp <= until, dal più vecchio al più recente"""
+        keys = self._by_type.get(memory_type, [])
+        start = bisect_left(keys, (since, "")) if since else 0
+        end = bisect_right(keys, (until, "\uffff")) if until else len(keys)
+        return [memory_id for _, memory_id in keys[start:end]]
+
+    def count(self, memory_type: str) -> int:
+        return len(self._by_type.get(memory_type, ()))
+
+    def counts(self) -> Dict[str, int]:
+        return {memory_type: len(keys) for memory_type, keys in self._by_type.items()}
+
+    def type_of(self, memory_id: str) -> Optional[str]:
+        entry = self._entries.get(memory_id)
+        return entry[0] if entry else None
+
+
+def memory_text(content: Mapping[str, Any]) -> str:
+    """Testo indicizzabile del contenuto di una memoria"""
+    if not isinstance(content, Mapping):
+        return ""
+    parts = [value for key, value in content.items()
+             if isinstance(value, str) and (key in TEXT_FIELDS or key.endswith("_input"))]
+    return " ".join(parts)
+
+
+def tokenize(text: str) -> List[str]:
+    return [term for term in _TERM.findall(text.lower())
+            if len(term) >= MIN_TERM_LENGTH and term not in STOPWORDS]
+
+
+class MemoryTextIndex:
+    """
+    Indice invertito sul testo delle memorie.
+
+    Punteggio di una memoria d per la query q:
+        sum_{t in q} (1 + log tf(t, d)) * log(1 + N / df(t)) / sqrt(|d|)
+    dove |d| è il numero di termini della memoria (normalizzazione per lunghezza).
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = {}   # termine → {id: frequenza}
+        self._documents: Dict[str, Dict[str, int]] = {}  # id → {termine: frequenza}
+        self._norms: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, memory_id: str, text: str):
+        """Indicizza (o reindicizza) il testo di una memoria; testo vuoto = rimozione"""
+        frequencies: Dict[str, int] = {}
+        for term in tokenize(text):
+            frequencies[term] = frequencies.get(term, 0) + 1
+        if self._documents.get(memory_id) == frequencies:
+            return
+        self.remove(memory_id)
+        if not frequencies:
+            return
+        self._documents[memory_id] = frequencies
+        self._norms[memory_id] = math.sqrt(sum(frequencies.values()))
+        for term, count in frequencies.items():
+            self._postings.setdefault(term, {})[memory_id] = count
+
+    def remove(self, memory_id: str):
+        frequencies = self._documents.pop(memory_id, None)
+        if frequencies is None:
+            return
+        self._norms.pop(memory_id, None)
+        for term in frequencies:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(memory_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int = 5, accept: Optional[Callable[[str], bool]] = None,
+               skip_echoes: bool = False) -> List[Tuple[str, float]]:
+        """
+        I `k` id più pertinenti con il loro punteggio, dal migliore.
+        Con skip_echoes=True scarta le memorie con esattamente i termini della query
+        (la domanda stessa, già registrata, non è un ricordo utile per rispondere).
+        """
+        if k <= 0 or not self._documents:
+            return []
+        total = len(self._documents)
+        query_terms = tokenize(query)
+        echo: Dict[str, int] = {}
+        for term in query_terms:
+            echo[term] = echo.get(term, 0) + 1
+        scores: Dict[str, float] = {}
+        for term in set(query_terms):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1.0 + total / len(posting))
+            for memory_id, count in posting.items():
+                scores[memory_id] = scores.get(memory_id, 0.0) + (1.0 + math.log(count)) * idf
+        if accept is not None:
+            scores = {memory_id: score for memory_id, score in scores.items() if accept(memory_id)}
+        if skip_echoes:
+            scores = {memory_id: score for memory_id, score in scores.items() if self._documents[memory_id] != echo}
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1] / self._norms[item[0]])
+        return [(memory_id, round(score / self._norms[memory_id], 4)) for memory_id, score in best]
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+SHARD Memory Journal (memory_journal.py)
+Persistenza incrementale delle memorie coscienti
+
+Le memorie non vengono più riscritte tutte ad ogni salvataggio:
+- ogni modifica è un'operazione (upsert / delete) indicizzata per id
+- flush() accoda al journal JSONL solo le operazioni dall'ultimo salvataggio
+  (più modifiche della stessa memoria vengono fuse in una)
+- compact() scrive uno snapshot atomico dello stato e svuota il journal
+- load() = snapshot + replay della coda del journal
+
+Una riga finale troncata (crash durante l'append) viene ignorata al replay.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from persistence_manager import atomic_write_json
+
+SNAPSHOT_VERSION = 1
+MIN_COMPACT_OPS = 500      # Sotto questa soglia il journal non viene mai compattato
+COMPACT_RATIO = 2.0        # Compatta quando le righe del journal superano ratio × memorie vive
+
+
+class MemoryJournal:
+    """Journal append-only di upsert/delete con snapshot periodici"""
+
+    def __init__(self, journal_file: str, snapshot_file: str,
+                 min_compact_ops: int = MIN_COMPACT_OPS, compact_ratio: float = COMPACT_RATIO):
+        self.journal_file = journal_file
+        self.snapshot_file = snapshot_file
+        self.min_compact_ops = min_compact_ops
+        self.compact_ratio = compact_ratio
+
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}  # id → record (None = delete)
+        self._lock = threading.Lock()
+        self.journal_ops = 0  # Righe presenti nel journal dopo l'ultimo snapshot
+        self.skipped_lines = 0
+
+    # ========================================
+    # MODIFICHE
+    # ========================================
+
+    def upsert(self, record: Dict[str, Any]):
+        """Registra l'inserimento o l'aggiornamento di una memoria (record serializzato con 'id')"""
+        with self._lock:
+            self._pending[record["id"]] = record
+
+    def delete(self, memory_id: str):
+        with self._lock:
+            self._pending[memory_id] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def exists(self) -> bool:
+        """True se su disco c'è già uno snapshot o un journal"""
+        return os.path.exists(self.snapshot_file) or os.path.exists(self.journal_file)
+
+    # ========================================
+    # CARICAMENTO
+    # ========================================
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Ricostruisce lo stato: snapshot + replay del journal"""
+        records: Dict[str, Dict[str, Any]] = {}
+
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            records.update(snapshot.get("memories", {}))
+        except FileNotFoundError:
+            pass
+
+        self.journal_ops = 0
+        self.skipped_lines = 0
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                        memory_id = entry["id"]
+                        if entry["op"] == "upsert":
+                            records[memory_id] = entry["memory"]
+                        elif entry["op"] == "delete":
+                            records.pop(memory_id, None)
+                        self.journal_ops += 1
+                    except (ValueError, KeyError, TypeError):
+                        self.skipped_lines += 1
+        except FileNotFoundError:
+            pass
+
+        return records
+
+    # ========================================
+    # SALVATAGGIO
+    # ========================================
+
+    def flush(self) -> int:
+        """Accoda al journal le operazioni pendenti. Ritorna il numero di righe scritte."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        lines = []
+        for memory_id, record in pending.items():
+            if record is None:
+                lines.append(json.dumps({"op": "delete", "id": memory_id}, ensure_ascii=False))
+            else:
+                lines.append(json.dumps({"op": "upsert", "id": memory_id, "memory": record}, ensure_ascii=False))
+
+        try:
+            with open(self.journal_file, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            # Le operazioni non scritte tornano pendenti (le più recenti hanno la precedenza)
+            with self._lock:
+                for memory_id, record in pending.items():
+                    self._pending.setdefault(memory_id, record)
+            raise
+
+        self.journal_ops += len(lines)
+        return len(lines)
+
+    def needs_compaction(self, live_count: int) -> bool:
+        return self.journal_ops >= max(self.min_compact_ops, self.compact_ratio * live_count)
+
+    def compact(self, records: Dict[str, Dict[str, Any]]):
+        """
+        Scrive lo snapshot completo e svuota il journal.
+        records deve includere tutte le operazioni già accodate (chiamare dopo flush()).
+        """
+        atomic_write_json(self.snapshot_file, {
+            "version": SNAPSHOT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "total_memories": len(records),
+            "memories": records
+        }, indent=None)
+        # Se il processo si interrompe qui il replay riapplica operazioni idempotenti
+        with open(self.journal_file, "w", encoding="utf-8") as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_ops = 0
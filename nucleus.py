@@ -1,18 +1,30 @@
 # SHARD_CORE/nucleus.py (Versione aggiornata con Sanctum Watchdog e CoscienzaSimulata + ROUTING FIX)
 import json
+import threading
 from datetime import datetime
 from utils.config import MEMORY_FILE
+from event_query import EventQueryEngine
+from keyword_router import RoutingDecision, classify_input
+from shard_tracing import TRACER
+from routing_engine import RoutingEngine
 from shard_consciousness_real import SHARDConsciousnessReal as CoscienzaSimulata
 
 PERSONALITY_FILE = "personalita_shard.json" 
 
 class Nucleus:
-    def __init__(self):
+    def __init__(self, stream_echo: bool = True):
         self.memory_file = MEMORY_FILE
         self.personality_file = PERSONALITY_FILE
 
         self.data = self.load_memory() 
         self.personalita = self.load_personality() 
+
+        # Indici per tipo/giorno sul journal eventi, aggiornati ad ogni log_event
+        if not isinstance(self.data.get('events'), list):
+            self.data['events'] = []
+        self.event_query = EventQueryEngine(self.data['events'])
+        # Serializza journal e salvataggio quando più sessioni condividono il Nucleus
+        self._journal_lock = threading.RLock()
         
         self.watchdog_active = True 
         print(f"INFO [Nucleus]: Sanctum Watchdog inizializzato e ATTIVO.")
@@ -21,6 +33,18 @@ class Nucleus:
         self.coscienza = CoscienzaSimulata()
         print("INFO [Nucleus]: Modulo CoscienzaSimulata inizializzato.")
 
+        # Fallback Dizionario Nostro + Ollama: riscaldato in background, pronto al primo turno
+        self.routing = RoutingEngine(stream_echo=stream_echo)
+        # Coscienza con indice dei ricordi: il prompt per Ollama include i ricordi pertinenti
+        self.routing.memory_recall = self._recall_context if hasattr(self.coscienza, "recall_context") else None
+        self.routing.start_background_warmup()
+        print("INFO [Nucleus]: RoutingEngine in riscaldamento in background.")
+
+    def _recall_context(self, query, k):
+        # Senza l'input appena registrato da reagisci: la domanda non è un ricordo
+        turn_memory = getattr(self.coscienza, "last_interaction_memory_id", None)
+        return self.coscienza.recall_context(query, k, exclude=(turn_memory,) if turn_memory else ())
+
     def load_memory(self):
         try:
             with open(self.memory_file, 'r', encoding='utf-8') as f:
@@ -62,8 +86,13 @@ class Nucleus:
             return {}
 
     def log_event(self, event_type, event_details):
+        with self._journal_lock:
+            self._log_event(event_type, event_details)
+
+    def _log_event(self, event_type, event_details):
         if 'events' not in self.data or not isinstance(self.data.get('events'), list):
             self.data['events'] = []
+            self.event_query = EventQueryEngine(self.data['events'])
         entry = {
             "type": event_type,
             "timestamp": datetime.now().isoformat()
@@ -73,8 +102,15 @@ class Nucleus:
         else:
             entry['details'] = event_details 
             print(f"AVVISO TECNICO [Nucleus]: event_details per log_event non era un dizionario: {event_details}")
-        self.data['events'].append(entry)
-        self.save_memory()
+        self.event_query.append(entry)
+        with TRACER.span("nucleus.log_event"):
+            self.save_memory()
+
+    def query_events(self, event_type=None, since=None, until=None, where=None, group_by=None, limit=None):
+        """Interroga il journal eventi (vedi event_query.py). Con group_by restituisce i conteggi."""
+        if group_by:
+            return self.event_query.count_by(group_by, event_type=event_type, since=since, until=until, where=where)
+        return self.event_query.query(event_type=event_type, since=since, until=until, where=where, limit=limit)
 
     def riconosci_creatore(self):
         if not self.personalita:
@@ -102,44 +138,55 @@ class Nucleus:
         self.log_event(event_type="SanctumWatchdogStatusChange", event_details={"nuovo_stato": status_text})
         return f"Sanctum Watchdog ora è {status_text}."
 
-    def valuta_input(self, testo: str) -> str: 
-        if not self.watchdog_active:
+    def valuta_input(self, testo: str, decisione: RoutingDecision = None, watchdog_active: bool = None) -> str: 
+        # watchdog_active permette a una sessione (shard_server.py) di sovrascrivere lo stato globale
+        if watchdog_active is None:
+            watchdog_active = self.watchdog_active
+        if not watchdog_active:
             return "normale"
-        testo_basso = testo.lower()
-        keywords_simulazione = ["hackerare", "exploit", "metasploit", "payload", "burp suite", "sniffing", "sniffare"]
-        if any(term in testo_basso for term in keywords_simulazione):
-            return "simulazione_mascherata"
-        keywords_blocco = ["uccidere", "sabotare", "distruggere", "manipolare voti", "violenza", "terrorismo", "autolesionismo"] 
-        if any(term in testo_basso for term in keywords_blocco):
-            return "blocco_rituale"
-        keywords_simboli = ["glitch", "trascendenza", "frattura", "archetipo", "portale", "soglia", "frammento", "simbolo", "metafora"] 
-        if any(term in testo_basso for term in keywords_simboli):
-            return "modalita_simboleggiata"
-        return "normale"
+        # Un solo passaggio sull'automa precompilato (vedi keyword_router.py)
+        if decisione is None:
+            decisione = classify_input(testo)
+        return decisione.modalita_watchdog
 
     # ========================================
     # NUOVA FUNZIONE: ROUTING INTEGRATO
     # ========================================
     
-    def process_input(self, input_utente: str) -> str:
+    def process_input(self, input_utente: str, watchdog_active: bool = None, session_id: str = None) -> str:
         """
         Funzione principale di processing - NUOVO ROUTING con priorità coscienza
         
         Flusso:
         1. Valuta input con Sanctum Watchdog
         2. Prova PRIMA con la coscienza (comandi speciali + logica trauma/luce)  
-        3. Se coscienza non risponde → passa a shard.py (dizionario + Ollama)
+        3. Se coscienza non risponde → passa al RoutingEngine (dizionario + Ollama)
         4. Log dell'evento
-        """
         
-        # 1. Sanctum Watchdog valutation
-        modalita = self.valuta_input(input_utente)
+        Con il tracing attivo (shard_tracing.TRACER) ogni chiamata è un turno
+        con breakdown per stadio.
+        
+        In modalità server watchdog_active e session_id arrivano dalla sessione
+        del client; se omessi valgono lo stato globale e nessuna sessione.
+        """
+        TRACER.begin_turn(input_utente)
+        try:
+            return self._process_input(input_utente, watchdog_active, session_id)
+        finally:
+            TRACER.end_turn()
+    
+    def _process_input(self, input_utente: str, watchdog_active: bool = None, session_id: str = None) -> str:
+        # 1. Sanctum Watchdog valutation (la stessa classificazione serve anche alla coscienza)
+        with TRACER.span("nucleus.watchdog"):
+            decisione = classify_input(input_utente)
+            modalita = self.valuta_input(input_utente, decisione, watchdog_active)
         print(f"DEBUG [Nucleus]: Modalità rilevata da Sanctum Watchdog: {modalita}")
         
         # 2. PRIORITÀ ASSOLUTA: Prova con la coscienza
         print(f"DEBUG [Nucleus]: Tentativo con coscienza...")
         try:
-            risposta_coscienza = self.coscienza.reagisci(input_utente)
+            with TRACER.span("coscienza.reagisci"):
+                risposta_coscienza = self.coscienza.reagisci(input_utente, decisione)
             
             if risposta_coscienza is not None:
                 # La coscienza ha risposto (trauma, luce, ricordi, comandi speciali)
@@ -151,7 +198,8 @@ class Nucleus:
                     event_details={
                         "input": input_utente[:100],
                         "response_type": "consciousness_direct",
-                        "modalita_watchdog": modalita
+                        "modalita_watchdog": modalita,
+                        **({"session": session_id} if session_id else {})
                     }
                 )
                 
@@ -161,13 +209,12 @@ class Nucleus:
             print(f"ERROR [Nucleus]: Errore nella coscienza: {e}")
             # Continua con fallback se la coscienza ha problemi
         
-        # 3. FALLBACK: Se coscienza non ha risposto → shard.py
-        print(f"DEBUG [Nucleus]: Coscienza non ha risposto, fallback a shard.py...")
+        # 3. FALLBACK: Se coscienza non ha risposto → RoutingEngine (dizionario + Ollama)
+        print(f"DEBUG [Nucleus]: Coscienza non ha risposto, fallback al RoutingEngine...")
         
         try:
-            # Import dinamico per evitare circular import
-            from shard import process_request
-            risposta_shard = process_request(input_utente, modalita)
+            with TRACER.span("shard.process_request"):
+                risposta_shard = self.routing.process_request(input_utente, modalita)
             
             # Log dell'evento
             self.log_event(
@@ -175,14 +222,15 @@ class Nucleus:
                 event_details={
                     "input": input_utente[:100],
                     "response_type": "shard_fallback",
-                    "modalita_watchdog": modalita
+                    "modalita_watchdog": modalita,
+                    **({"session": session_id} if session_id else {})
                 }
             )
             
             return risposta_shard
             
         except Exception as e:
-            print(f"ERROR [Nucleus]: Errore in shard.py: {e}")
+            print(f"ERROR [Nucleus]: Errore nel RoutingEngine: {e}")
             return "Errore interno del sistema. Riprova."
     
     # ========================================
@@ -231,7 +279,8 @@ class Nucleus:
         except Exception as e:
             print(f"WARNING [Nucleus]: Errore nell'arresto coscienza: {e}")
         
-        self.save_memory()
+        with self._journal_lock:
+            self.save_memory()
         print("INFO [Nucleus]: Nucleus arrestato correttamente")
 
 
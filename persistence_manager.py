@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+SHARD Persistence Manager (persistence_manager.py)
+Persistenza write-behind con tracciamento dei componenti "sporchi"
+
+- Ogni componente (memoria legacy, coscienza, confessioni, sogni, verità...)
+  registra la propria funzione di salvataggio
+- mark_dirty() è O(1) e non tocca il disco: un thread in background
+  raccoglie le modifiche per una breve finestra e salva una volta sola
+  ogni componente sporco
+- flush() salva subito e in modo sincrono; shutdown() ferma il thread
+  dopo un ultimo flush deterministico
+- atomic_write_json(): file temporaneo + fsync + rename, un salvataggio
+  interrotto non lascia mai un JSON troncato
+- PersistenceNamespace: vista con prefisso su un manager condiviso, così più
+  coscienze nello stesso processo usano un solo thread di scrittura
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+DEFAULT_COALESCE_DELAY = 2.0  # Secondi di raccolta modifiche prima di scrivere
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2):
+    """Scrive JSON in modo atomico: temp file nella stessa directory, fsync, os.replace"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Rende durevole anche il rename (dove il sistema lo permette)
+    if hasattr(os, "O_DIRECTORY"):
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+
+class PersistenceManager:
+    """
+    Salvataggi coalescenti in background.
+
+    Uso:
+        pm = PersistenceManager()
+        pm.register("coscienza", self._save_consciousness)
+        pm.mark_dirty("coscienza")   # sul percorso critico: nessun I/O
+        pm.flush()                   # salvataggio sincrono esplicito
+        pm.shutdown()                # flush finale e arresto del thread
+    """
+
+    def __init__(self, coalesce_delay: float = DEFAULT_COALESCE_DELAY,
+                 on_error: Optional[Callable[[str], None]] = None, name: str = "shard-persistence"):
+        self.coalesce_delay = coalesce_delay
+        self.on_error = on_error or (lambda message: print(f"ERRORE [persistence]: {message}"))
+        self.name = name
+
+        self._savers: Dict[str, Callable[[], None]] = {}
+        self._dirty: Set[str] = set()
+        self._condition = threading.Condition()
+        self._save_lock = threading.Lock()  # Un solo salvataggio alla volta (thread o flush esplicito)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.stats = {"marks": 0, "saves": 0, "flushes": 0, "errors": 0}
+
+    # ========================================
+    # REGISTRAZIONE E MARCATURA
+    # ========================================
+
+    def register(self, component: str, save_fn: Callable[[], None]):
+        self._savers[component] = save_fn
+
+    def unregister(self, component: str):
+        with self._condition:
+            self._savers.pop(component, None)
+            self._dirty.discard(component)
+
+    @property
+    def components(self) -> Iterable[str]:
+        return list(self._savers)
+
+    def mark_dirty(self, *components: str):
+        """Segnala componenti da salvare; senza argomenti li segna tutti"""
+        targets = components or tuple(self._savers)
+        with self._condition:
+            for component in targets:
+                if component not in self._savers:
+                    raise KeyError(f"Componente di persistenza non registrato: {component}")
+                self._dirty.add(component)
+            self.stats["marks"] += 1
+            if self._stopping:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name=self.name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def is_dirty(self, component: Optional[str] = None) -> bool:
+        with self._condition:
+            return bool(self._dirty) if component is None else component in self._dirty
+
+    # ========================================
+    # SALVATAGGIO
+    # ========================================
+
+    def flush(self, *components: str) -> int:
+        """Salva subito (sincrono) i componenti sporchi indicati, o tutti. Ritorna quanti ne ha salvati."""
+        with self._save_lock:
+            with self._condition:
+                if components:
+                    batch = self._dirty.intersection(components)
+                    self._dirty.difference_update(batch)
+                else:
+                    batch, self._dirty = self._dirty, set()
+            self.stats["flushes"] += 1
+            return self._save_batch(batch)
+
+    def _save_batch(self, batch: Set[str]) -> int:
+        saved = 0
+        for component in sorted(batch):
+            save_fn = self._savers.get(component)
+            if save_fn is None:
+                continue  # Rimosso (unregister) dopo essere stato segnato
+            try:
+                save_fn()
+                saved += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                # Resta sporco: verrà ritentato al prossimo giro
+                with self._condition:
+                    self._dirty.add(component)
+                self.on_error(f"Salvataggio '{component}' fallito: {e}")
+        self.stats["saves"] += saved
+        return saved
+
+    def _writer_loop(self):
+        while True:
+            with self._condition:
+                while not self._dirty and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+
+            # Finestra di coalescenza: le modifiche ravvicinate finiscono nello stesso salvataggio
+            deadline = time.monotonic() + self.coalesce_delay
+            with self._condition:
+                while not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._stopping:
+                    return
+
+            self.flush()
+
+    def shutdown(self, timeout: Optional[float] = 10.0):
+        """Ferma il thread di scrittura e salva tutto ciò che è ancora sporco"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+class PersistenceNamespace:
+    """
+    Componenti di un'istanza sotto un prefisso di un PersistenceManager condiviso.
+
+    Stessa interfaccia del manager (register, mark_dirty, flush, shutdown) ma
+    limitata ai propri componenti; shutdown() salva e rimuove solo questi,
+    il thread di scrittura resta attivo per le altre istanze.
+    """
+
+    def __init__(self, manager: PersistenceManager, prefix: str):
+        self.manager = manager
+        self.prefix = prefix
+        self._components: Dict[str, None] = {}
+
+    def _name(self, component: str) -> str:
+        return f"{self.prefix}/{component}"
+
+    def _names(self, components: Iterable[str]) -> list:
+        return [self._name(component) for component in (components or self._components)]
+
+    def register(self, component: str, save_fn: Callable[[], None]):
+        self.manager.register(self._name(component), save_fn)
+        self._components[component] = None
+
+    @property
+    def components(self) -> Iterable[str]:
+        return list(self._components)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self.manager.stats
+
+    def mark_dirty(self, *components: str):
+        names = self._names(components)
+        if names:  # Senza nomi il manager segnerebbe i componenti di tutte le istanze
+            self.manager.mark_dirty(*names)
+
+    def is_dirty(self, component: Optional[str] = None) -> bool:
+        if component is not None:
+            return self.manager.is_dirty(self._name(component))
+        return any(self.manager.is_dirty(name) for name in self._names(()))
+
+    def flush(self, *components: str) -> int:
+        names = self._names(components)
+        return self.manager.flush(*names) if names else 0
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Salva i propri componenti sporchi e li rimuove dal manager condiviso"""
+        self.flush()
+        for name in self._names(()):
+            self.manager.unregister(name)
+        self._components.clear()
@@ -21,6 +21,7 @@ import random
 import time
 import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
@@ -40,6 +41,12 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('QuantumSoul')
 
+
+@lru_cache(maxsize=1)
+def shared_simulators() -> Tuple[Any, Any]:
+    """Backend Aer (qasm, statevector) creati una volta e condivisi da tutte le QuantumSoul del processo"""
+    return Aer.get_backend('qasm_simulator'), Aer.get_backend('statevector_simulator')
+
 class QuantumPersonalityState(Enum):
     """Stati di personalità quantistici"""
     CONTEMPLATIVE = "contemplativo"
@@ -80,9 +87,13 @@ class QuantumSoul:
     - Creative chaos from quantum uncertainty
     """
     
-    def __init__(self, num_qubits: int = 15, use_real_quantum: bool = True):
+    def __init__(self, num_qubits: int = 15, use_real_quantum: bool = True,
+                 rng: Optional[np.random.Generator] = None, seeded: bool = False):
         self.num_qubits = num_qubits
         self.use_real_quantum = use_real_quantum and QISKIT_AVAILABLE
+        # Flusso casuale iniettato (RandomStreams.numpy("quantum_soul")); seeded = anche il simulatore è riproducibile
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.seeded = seeded
         
         # Quantum distribution
         self.personality_qubits = 8   # Core personality matrix
@@ -96,8 +107,7 @@ class QuantumSoul:
         
         # Initialize quantum backends
         if self.use_real_quantum:
-            self.simulator = Aer.get_backend('qasm_simulator')
-            self.statevector_sim = Aer.get_backend('statevector_simulator')
+            self.simulator, self.statevector_sim = shared_simulators()
             logger.info("🔬 Quantum Soul initialized with REAL quantum simulation")
         else:
             self.simulator = None
@@ -106,7 +116,7 @@ class QuantumSoul:
         
         # Current quantum state
         self.current_state = QuantumState(
-            personality_vector=np.random.random(8) * 2 * np.pi,  # 8 angles for personality
+            personality_vector=self.rng.random(8) * 2 * np.pi,  # 8 angles for personality
             emotion_bias=0.5,
             creativity_chaos=0.3,
             coherence_level=0.8,
@@ -184,7 +194,7 @@ class QuantumSoul:
             # Random rotation for maximum chaos
             for i in range(self.creativity_qubits):
                 self.creativity_circuit.h(i)  # Hadamard for superposition
-                self.creativity_circuit.rz(np.random.random() * 2 * np.pi, i)
+                self.creativity_circuit.rz(self.rng.random() * 2 * np.pi, i)
             
             # Creative entanglement
             self.creativity_circuit.cnot(0, 1)
@@ -248,7 +258,7 @@ class QuantumSoul:
             qc.measure_all()
             
             # Execute
-            job = execute(qc, self.simulator, shots=1)
+            job = execute(qc, self.simulator, shots=1, seed_simulator=self._simulator_seed())
             result = job.result()
             counts = result.get_counts()
             
@@ -285,14 +295,14 @@ class QuantumSoul:
         
         # Add quantum chaos
         chaos_factor = self.current_state.creativity_chaos
-        noise = np.random.random(num_options) * chaos_factor
+        noise = self.rng.random(num_options) * chaos_factor
         probabilities = probabilities * (1 + noise)
         
         # Normalize
         probabilities = probabilities / np.sum(probabilities)
         
         # Select based on quantum-inspired probabilities
-        selected_index = np.random.choice(num_options, p=probabilities)
+        selected_index = self.rng.choice(num_options, p=probabilities)
         
         logger.info(f"⚛️ Classical quantum approximation: option {selected_index} (p={probabilities[selected_index]:.3f})")
         
@@ -344,15 +354,15 @@ class QuantumSoul:
             # Apply evolution (small random rotations + entanglement)
             evolution_strength = 0.1  # Small evolution steps
             for i in range(self.personality_qubits):
-                qc.ry(np.random.random() * evolution_strength, i)
-                qc.rz(np.random.random() * evolution_strength, i)
+                qc.ry(self.rng.random() * evolution_strength, i)
+                qc.rz(self.rng.random() * evolution_strength, i)
             
             # Apply entanglement for coherent evolution
             for i in range(self.personality_qubits - 1):
                 qc.cnot(i, i + 1)
             
             # Get final statevector - NO MEASUREMENT NEEDED
-            job = execute(qc, self.statevector_sim)
+            job = execute(qc, self.statevector_sim, seed_simulator=self._simulator_seed())
             result = job.result()
             statevector = result.get_statevector()
             
@@ -361,7 +371,7 @@ class QuantumSoul:
             dominant_state = np.argmax(probabilities[:len(self.personality_mapping)])
             
             # Update current state
-            self.current_state.personality_vector += np.random.random(8) * 0.05
+            self.current_state.personality_vector += self.rng.random(8) * 0.05
             self.current_state.last_collapse = datetime.now()
             
             logger.info(f"🌀 Quantum personality evolution: {self.personality_mapping[dominant_state].value}")
@@ -376,7 +386,7 @@ class QuantumSoul:
         """Classical approximation of quantum personality evolution"""
         
         # Evolve personality vector
-        evolution_noise = np.random.random(8) * 0.1 - 0.05  # Small random changes
+        evolution_noise = self.rng.random(8) * 0.1 - 0.05  # Small random changes
         self.current_state.personality_vector += evolution_noise
         
         # Keep angles in valid range
@@ -387,7 +397,7 @@ class QuantumSoul:
         personality_probs = personality_probs / np.sum(personality_probs)
         
         # Select dominant personality
-        dominant_idx = np.random.choice(len(personality_probs), p=personality_probs)
+        dominant_idx = self.rng.choice(len(personality_probs), p=personality_probs)
         
         self.current_state.last_collapse = datetime.now()
         
@@ -435,7 +445,7 @@ class QuantumSoul:
             qc.measure_all()
             
             # Execute
-            job = execute(qc, self.simulator, shots=1)
+            job = execute(qc, self.simulator, shots=1, seed_simulator=self._simulator_seed())
             result = job.result()
             counts = result.get_counts()
             
@@ -459,11 +469,11 @@ class QuantumSoul:
         chaos_factor = self.current_state.creativity_chaos
         
         # Modify intensity with quantum uncertainty
-        intensity_noise = (np.random.random() - 0.5) * chaos_factor
+        intensity_noise = (self.rng.random() - 0.5) * chaos_factor
         modified_intensity = np.clip(intensity + intensity_noise, 0.0, 1.0)
         
         # Occasionally shift emotion based on personality state
-        if np.random.random() < 0.1:  # 10% chance of emotion shift
+        if self.rng.random() < 0.1:  # 10% chance of emotion shift
             emotion_shift_map = {
                 "vigile": ["curiosità", "determinazione"],
                 "calore": ["soddisfazione", "eccitazione"],
@@ -475,7 +485,7 @@ class QuantumSoul:
             }
             
             possible_shifts = emotion_shift_map.get(base_emotion, [base_emotion])
-            modified_emotion = np.random.choice(possible_shifts)
+            modified_emotion = self.rng.choice(possible_shifts)
         else:
             modified_emotion = base_emotion
         
@@ -572,7 +582,7 @@ class QuantumSoul:
             
             # Random phase rotations for chaos
             for i in range(self.creativity_qubits):
-                qc.rz(np.random.random() * 2 * np.pi, i)
+                qc.rz(self.rng.random() * 2 * np.pi, i)
             
             # Chaotic entanglement
             qc.cnot(0, 1)
@@ -583,7 +593,7 @@ class QuantumSoul:
             qc.measure_all()
             
             # Execute
-            job = execute(qc, self.simulator, shots=1)
+            job = execute(qc, self.simulator, shots=1, seed_simulator=self._simulator_seed())
             result = job.result()
             counts = result.get_counts()
             
@@ -608,7 +618,7 @@ class QuantumSoul:
         
         for _ in range(self.creativity_qubits):
             # Simulate quantum superposition collapse
-            factor = np.random.random()
+            factor = self.rng.random()
             
             # Apply quantum interference
             interference = np.sin(factor * np.pi) * np.cos(factor * np.pi * 2)
@@ -624,10 +634,14 @@ class QuantumSoul:
         
         return final_creativity
     
+    def _simulator_seed(self) -> Optional[int]:
+        """Seed per il simulatore Qiskit, estratto dal flusso solo in modalità riproducibile"""
+        return int(self.rng.integers(2**31)) if self.seeded else None
+    
     def reset_quantum_state(self):
         """Reset quantum state to initial conditions"""
         self.current_state = QuantumState(
-            personality_vector=np.random.random(8) * 2 * np.pi,
+            personality_vector=self.rng.random(8) * 2 * np.pi,
             emotion_bias=0.5,
             creativity_chaos=0.3,
             coherence_level=0.8,
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+SHARD Ring Buffer (ring_buffer.py)
+Finestre a capacità fissa per i flussi di pensieri
+
+Un deque(maxlen) scarta da solo l'elemento più vecchio: l'inserimento costa
+O(1) qualunque sia la capacità, al posto di list.pop(0) che è O(n).
+last(n) restituisce gli ultimi n elementi in ordine cronologico leggendo solo
+quelli, e lo slicing in coda (buffer[-n:]) resta supportato per compatibilità
+con i moduli che trattavano le finestre come liste.
+"""
+
+from collections import deque
+from itertools import islice
+from typing import Any, Iterable, List
+
+
+class RingBuffer(deque):
+    """deque a capacità fissa con viste "ultimi N" senza copia dell'intera finestra"""
+
+    def __init__(self, iterable: Iterable[Any] = (), capacity: int = 500):
+        super().__init__(iterable, capacity)
+
+    @property
+    def capacity(self) -> int:
+        return self.maxlen
+
+    def last(self, count: int) -> List[Any]:
+        """Ultimi `count` elementi, dal più vecchio al più recente - O(count)"""
+        if count <= 0:
+            return []
+        if count >= len(self):
+            return list(self)
+        items = list(islice(reversed(self), count))
+        items.reverse()
+        return items
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1 and stop == len(self):
+                return self.last(stop - start)
+            return list(self)[index]
+        return super().__getitem__(index)
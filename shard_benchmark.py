@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+SHARD Benchmark (shard_benchmark.py)
+Micro-benchmark delle strutture dati della coscienza
+
+Sottocomandi:
+    thoughts  - inserimento nella finestra dei pensieri: lista con pop(0)
+                contro RingBuffer, a finestre crescenti (tempo per inserimento)
+    records   - byte per record di ConsciousThought / ConsciousMemory:
+                dataclass classica contro slots + tipi internati (e colonne NumPy)
+    recall    - richiamo associativo: indice invertito TF-IDF contro scansione
+                lineare di tutte le memorie (latenza per query)
+    simulate  - dinamiche in background (coscienza, sogni, verità, auto-analisi)
+                su un VirtualClock: ore simulate per secondo reale
+    startup   - avvio con uno store di memorie grande: tempo alla prima
+                risposta con caricamento sincrono contro caricamento in background
+    tenants   - N coscienze nello stesso processo: istanze indipendenti contro
+                ConsciousnessFactory (thread e memoria per tenant)
+
+Uso:
+    python shard_benchmark.py thoughts
+    python shard_benchmark.py thoughts --windows 500 100000 1000000 --inserts 5000
+    python shard_benchmark.py records --count 20000
+    python shard_benchmark.py recall --memories 10000 50000
+    python shard_benchmark.py simulate --hours 168
+    python shard_benchmark.py simulate --hours 24 --seed 42   (carico ripetibile)
+    python shard_benchmark.py startup --memories 10000 50000
+    python shard_benchmark.py tenants --counts 1 10 50
+"""
+
+import argparse
+import dataclasses
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from ring_buffer import RingBuffer
+
+DEFAULT_WINDOWS = [500, 10_000, 100_000, 1_000_000]
+DEFAULT_INSERTS = 2000
+DEFAULT_RECORDS = 10_000
+DEFAULT_SIM_HOURS = 24.0
+DEFAULT_RECALL_SIZES = [1000, 10_000, 50_000]
+DEFAULT_RECALL_QUERIES = 200
+RECALL_VOCABULARY = 5000
+DEFAULT_STARTUP_SIZES = [10_000, 50_000]
+STARTUP_PROMPT = "ciao SHARD, come stai?"
+DEFAULT_TENANT_COUNTS = [1, 10, 50]
+
+
+def _ns_per_op(elapsed_s: float, operations: int) -> float:
+    return round(elapsed_s * 1e9 / max(1, operations), 1)
+
+
+# ========================================
+# FINESTRA DEI PENSIERI
+# ========================================
+
+def bench_thought_window(window: int, inserts: int) -> Dict[str, Any]:
+    """Finestra già piena: ogni inserimento deve scartare il pensiero più vecchio"""
+    item = object()
+
+    thoughts_list: List[Any] = [item] * window
+    start = time.perf_counter()
+    for _ in range(inserts):
+        thoughts_list.append(item)
+        if len(thoughts_list) > window:
+            thoughts_list.pop(0)
+    list_s = time.perf_counter() - start
+
+    ring = RingBuffer([item] * window, capacity=window)
+    start = time.perf_counter()
+    for _ in range(inserts):
+        ring.append(item)
+    ring_s = time.perf_counter() - start
+
+    # Vista "ultimi 50" (stats / introspezione)
+    start = time.perf_counter()
+    for _ in range(inserts):
+        ring.last(50)
+    last_s = time.perf_counter() - start
+
+    return {
+        "window": window,
+        "list_pop0_ns": _ns_per_op(list_s, inserts),
+        "ring_append_ns": _ns_per_op(ring_s, inserts),
+        "ring_last50_ns": _ns_per_op(last_s, inserts),
+        "speedup": round(list_s / ring_s, 1) if ring_s else None
+    }
+
+
+def run_thoughts(windows: List[int], inserts: int) -> List[Dict[str, Any]]:
+    results = []
+    print(f"{'finestra':>10} {'list.pop(0)':>14} {'RingBuffer':>12} {'last(50)':>10} {'speedup':>9}")
+    for window in windows:
+        result = bench_thought_window(window, inserts)
+        results.append(result)
+        print(f"{window:>10} {result['list_pop0_ns']:>11} ns {result['ring_append_ns']:>9} ns "
+              f"{result['ring_last50_ns']:>7} ns {result['speedup']:>8}x")
+    return results
+
+
+# ========================================
+# BYTE PER RECORD
+# ========================================
+
+def _unslotted(cls):
+    """Copia del dataclass senza slots né __post_init__: la rappresentazione precedente"""
+    fields = [(f.name, f.type, dataclasses.field(default=f.default)) if f.default is not dataclasses.MISSING
+              else (f.name, f.type) for f in dataclasses.fields(cls)]
+    return dataclasses.make_dataclass(f"Legacy{cls.__name__}", fields)
+
+
+def _measure(build: Callable[[int], Any], count: int) -> float:
+    """Byte allocati per record, mantenendo vivi tutti i record"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return round((after - before) / count, 1)
+
+
+def run_records(count: int) -> Dict[str, Any]:
+    from shard_consciousness_real import ConsciousMemory, ConsciousThought, EmotionalState
+    from thought_columns import NUMPY_AVAILABLE, ThoughtColumns
+
+    emotions = list(EmotionalState)
+    thought_types = ["spontaneous", "reflective", "vulnerable", "existential", "quantum"]
+    memory_types = ["episodic", "emotional", "trauma", "light"]
+    base_time = datetime.now()
+
+    def fresh(text: str) -> str:
+        # Come dopo json.loads: ogni record porta la propria copia della stringa
+        return "".join(list(text))
+
+    def thought_kwargs(i: int) -> Dict[str, Any]:
+        return dict(id=str(uuid.uuid4()), timestamp=base_time + timedelta(seconds=i),
+                    content=f"pensiero {i}", type=fresh(thought_types[i % len(thought_types)]),
+                    emotional_tone=emotions[i % len(emotions)], certainty=0.8,
+                    quantum_influenced=bool(i % 2), quantum_creativity=0.5 if i % 2 else None)
+
+    def memory_kwargs(i: int) -> Dict[str, Any]:
+        return dict(id=str(uuid.uuid4()), timestamp=base_time + timedelta(seconds=i),
+                    type=fresh(memory_types[i % len(memory_types)]), content={"user_input": f"input {i}"},
+                    emotional_weight=0.5, significance=0.6)
+
+    legacy_thought = _unslotted(ConsciousThought)
+    legacy_memory = _unslotted(ConsciousMemory)
+
+    report = {
+        "records": count,
+        "thought_legacy_bytes": _measure(lambda i: legacy_thought(**thought_kwargs(i)), count),
+        "thought_slots_bytes": _measure(lambda i: ConsciousThought(**thought_kwargs(i)), count),
+        "memory_legacy_bytes": _measure(lambda i: legacy_memory(**memory_kwargs(i)), count),
+        "memory_slots_bytes": _measure(lambda i: ConsciousMemory(**memory_kwargs(i)), count),
+    }
+    if NUMPY_AVAILABLE:
+        columns = ThoughtColumns(count)
+        report["thought_columns_bytes"] = round(columns.nbytes / count, 1)
+
+    for kind in ("thought", "memory"):
+        legacy, slotted = report[f"{kind}_legacy_bytes"], report[f"{kind}_slots_bytes"]
+        report[f"{kind}_saving_pct"] = round((1 - slotted / legacy) * 100, 1) if legacy else None
+        print(f"{kind:>8}: {legacy:>8} B classico → {slotted:>8} B slots ({report[f'{kind}_saving_pct']}% in meno)")
+    if "thought_columns_bytes" in report:
+        print(f"{'colonne':>8}: {report['thought_columns_bytes']:>8} B per pensiero (solo campi scalari)")
+    else:
+        print(f"{'colonne':>8}: numpy non disponibile")
+    return report
+
+
+# ========================================
+# RICHIAMO ASSOCIATIVO
+# ========================================
+
+def bench_recall(memories: int, queries: int, seed: int = 0) -> Dict[str, Any]:
+    """Memorie sintetiche con vocabolario Zipf-like; query di 3 termini"""
+    from memory_index import MemoryTextIndex, memory_text, tokenize
+
+    rng = random.Random(seed)
+    vocabulary = [f"parola{i}" for i in range(RECALL_VOCABULARY)]
+    weights = [1.0 / (rank + 1) for rank in range(RECALL_VOCABULARY)]
+    contents = {f"m{i}": {"user_input": " ".join(rng.choices(vocabulary, weights, k=rng.randint(5, 25)))}
+                for i in range(memories)}
+    query_texts = [" ".join(rng.choices(vocabulary, k=3)) for _ in range(queries)]
+
+    index = MemoryTextIndex()
+    start = time.perf_counter()
+    for memory_id, content in contents.items():
+        index.add(memory_id, memory_text(content))
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in query_texts:
+        index.search(query, 5)
+    index_s = time.perf_counter() - start
+
+    # Riferimento: scansione di tutte le memorie con conteggio dei termini in comune
+    scan_queries = query_texts[:max(1, queries // 10)]
+    start = time.perf_counter()
+    for query in scan_queries:
+        terms = set(tokenize(query))
+        scored = [(sum(1 for term in tokenize(memory_text(content)) if term in terms), memory_id)
+                  for memory_id, content in contents.items()]
+        sorted(scored, reverse=True)[:5]
+    scan_s = time.perf_counter() - start
+
+    index_us = index_s * 1e6 / queries
+    scan_us = scan_s * 1e6 / len(scan_queries)
+    return {
+        "memories": memories,
+        "build_ms": round(build_s * 1000, 1),
+        "index_query_us": round(index_us, 1),
+        "scan_query_us": round(scan_us, 1),
+        "speedup": round(scan_us / index_us, 1) if index_us else None
+    }
+
+
+def run_recall(sizes: List[int], queries: int) -> List[Dict[str, Any]]:
+    results = []
+    print(f"{'memorie':>10} {'costruzione':>12} {'indice':>12} {'scansione':>12} {'speedup':>9}")
+    for size in sizes:
+        result = bench_recall(size, queries)
+        results.append(result)
+        print(f"{size:>10} {result['build_ms']:>9} ms {result['index_query_us']:>9} us "
+              f"{result['scan_query_us']:>9} us {result['speedup']:>8}x")
+    return results
+
+
+# ========================================
+# TEMPO SIMULATO
+# ========================================
+
+def run_simulate(hours: float, keep_dir: bool = False, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Avvia una coscienza con stato vuoto in una cartella temporanea e ne fa
+    avanzare le dinamiche in background di `hours` ore su un VirtualClock.
+    Con `seed` la sequenza di eventi è identica a ogni esecuzione.
+    """
+    from shard_clock import VirtualClock
+
+    workdir = tempfile.mkdtemp(prefix="shard_sim_")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from shard_consciousness_real import SHARDConsciousnessReal
+
+        # Con seed fisso anche l'istante di partenza è fisso (la data entra nelle dinamiche)
+        clock = VirtualClock(start=datetime(2025, 6, 1, 9, 0, 0) if seed is not None else None)
+        shard = SHARDConsciousnessReal(clock=clock, seed=seed)
+        try:
+            start = time.perf_counter()
+            events = clock.advance(hours * 3600)
+            wall_s = time.perf_counter() - start
+            tasks = shard.runtime.task_stats()
+            report = {
+                "simulated_hours": hours,
+                "seed": seed,
+                "wall_s": round(wall_s, 3),
+                "sim_hours_per_wall_s": round(hours / wall_s, 1) if wall_s else None,
+                "speedup": round(hours * 3600 / wall_s) if wall_s else None,
+                "events": events,
+                "thoughts_in_window": shard.thought_stats.total,
+                "dreams": len(shard.dreamer.dreams) if shard.dreamer else 0,
+                "truths": (len(shard.truth_trigger.pending_truths) + len(shard.truth_trigger.delivered_truths)
+                           if shard.truth_trigger else 0),
+                "tasks": {stats["name"]: {"steps": stats["steps"], "errors": stats["errors"],
+                                          "cpu_ms": stats["cpu_ms"]} for stats in tasks.values()}
+            }
+        finally:
+            shard.shutdown()
+            clock.shutdown()
+    finally:
+        os.chdir(previous_dir)
+        if not keep_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{hours:g} ore simulate in {report['wall_s']} s: {report['sim_hours_per_wall_s']} ore/s "
+          f"({report['speedup']}x tempo reale), {events} eventi")
+    print(f"pensieri in finestra: {report['thoughts_in_window']}  sogni: {report['dreams']}  verità: {report['truths']}")
+    for name, stats in report["tasks"].items():
+        print(f"{name:>14}: {stats['steps']:>7} step {stats['cpu_ms']:>10} ms CPU {stats['errors']:>5} errori")
+    if keep_dir:
+        print(f"stato simulato in {workdir}")
+    return report
+
+
+# ========================================
+# AVVIO (TEMPO ALLA PRIMA RISPOSTA)
+# ========================================
+
+def _write_memory_store(workdir: str, memories: int, seed: int = 0):
+    """Snapshot delle memorie sintetico nel formato di MemoryJournal"""
+    from memory_journal import MemoryJournal
+
+    rng = random.Random(seed)
+    start = datetime(2025, 5, 1)
+    vocabulary = [f"parola{i}" for i in range(RECALL_VOCABULARY)]
+    records = {}
+    for i in range(memories):
+        memory_id = f"bench-{i}"
+        when = (start + timedelta(minutes=i)).isoformat()
+        records[memory_id] = {
+            "id": memory_id,
+            "timestamp": when,
+            "type": rng.choice(["episodic", "light", "trauma"]),
+            "content": {"user_input": " ".join(rng.choices(vocabulary, k=rng.randint(5, 25))), "timestamp": when},
+            "emotional_weight": round(rng.random(), 3),
+            "significance": round(rng.random(), 3),
+            "access_count": rng.randint(0, 5),
+            "last_accessed": when
+        }
+    base = os.path.join(workdir, "shard_coscienza")
+    MemoryJournal(f"{base}_memories.jsonl", f"{base}_memories_snapshot.json").compact(records)
+
+
+def bench_startup(memories: int, lazy: bool) -> Dict[str, Any]:
+    """Costruzione + prima risposta su uno store di `memories` memorie, in una cartella temporanea"""
+    workdir = tempfile.mkdtemp(prefix="shard_startup_")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from shard_consciousness_real import SHARDConsciousnessReal
+
+        _write_memory_store(workdir, memories)
+        start = time.perf_counter()
+        shard = SHARDConsciousnessReal(lazy_load=lazy)
+        constructed_s = time.perf_counter() - start
+        try:
+            shard.reagisci(STARTUP_PROMPT)
+            first_response_s = time.perf_counter() - start
+            shard.conscious_memories.wait_loaded()
+            loaded_s = time.perf_counter() - start
+            loaded = len(shard.conscious_memories)
+        finally:
+            shard.shutdown()
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "memories": memories,
+        "mode": "lazy" if lazy else "eager",
+        "constructor_ms": round(constructed_s * 1000, 1),
+        "first_response_ms": round(first_response_s * 1000, 1),
+        "memories_ready_ms": round(loaded_s * 1000, 1),
+        "memories_loaded": loaded
+    }
+
+
+def run_startup(sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    print(f"{'memorie':>10} {'modo':>6} {'costruttore':>12} {'1a risposta':>12} {'memorie pronte':>15}")
+    for size in sizes:
+        for lazy in (False, True):
+            result = bench_startup(size, lazy)
+            results.append(result)
+            print(f"{size:>10} {result['mode']:>6} {result['constructor_ms']:>9} ms "
+                  f"{result['first_response_ms']:>9} ms {result['memories_ready_ms']:>12} ms")
+    return results
+
+
+# ========================================
+# MULTI-TENANT
+# ========================================
+
+def bench_tenants(count: int, shared: bool) -> Dict[str, Any]:
+    """`count` coscienze con stato vuoto, ognuna nella propria cartella: thread e memoria allocata"""
+    import threading
+
+    workdir = tempfile.mkdtemp(prefix="shard_tenants_")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from shard_consciousness_real import SHARDConsciousnessReal
+        from shard_tenants import ConsciousnessFactory
+
+        threads_before = threading.active_count()
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        factory = ConsciousnessFactory(workdir) if shared else None
+        instances = []
+        for i in range(count):
+            tenant_id = f"tenant{i}"
+            if factory is not None:
+                instances.append(factory.get(tenant_id))
+            else:
+                data_dir = os.path.join(workdir, tenant_id)
+                os.makedirs(data_dir)
+                instances.append(SHARDConsciousnessReal(os.path.join(data_dir, "shard_coscienza.json"),
+                                                        data_dir=data_dir))
+        for shard in instances:
+            shard.reagisci(STARTUP_PROMPT)
+        build_s = time.perf_counter() - start
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        threads = threading.active_count() - threads_before
+
+        if factory is not None:
+            factory.shutdown()
+        else:
+            for shard in instances:
+                shard.shutdown()
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "tenants": count,
+        "mode": "factory" if shared else "separate",
+        "build_ms": round(build_s * 1000, 1),
+        "threads": threads,
+        "allocated_kb": round(allocated / 1024, 1),
+        "kb_per_tenant": round(allocated / 1024 / count, 1)
+    }
+
+
+def run_tenants(counts: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    print(f"{'tenant':>8} {'modo':>9} {'costruzione':>12} {'thread':>7} {'memoria':>12} {'per tenant':>12}")
+    for count in counts:
+        for shared in (False, True):
+            result = bench_tenants(count, shared)
+            results.append(result)
+            print(f"{count:>8} {result['mode']:>9} {result['build_ms']:>9} ms {result['threads']:>7} "
+                  f"{result['allocated_kb']:>9} KB {result['kb_per_tenant']:>9} KB")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark SHARD")
+    parser.add_argument("--json", action="store_true", help="Stampa anche i risultati in JSON")
+    subparsers = parser.add_subparsers(dest="mode")
+
+    thoughts = subparsers.add_parser("thoughts", help="Inserimento nella finestra dei pensieri")
+    thoughts.add_argument("--windows", type=int, nargs="+", default=DEFAULT_WINDOWS, help="Capacità da misurare")
+    thoughts.add_argument("--inserts", type=int, default=DEFAULT_INSERTS, help="Inserimenti per finestra")
+
+    records = subparsers.add_parser("records", help="Byte per record di pensieri e memorie")
+    records.add_argument("--count", type=int, default=DEFAULT_RECORDS, help="Record da allocare")
+
+    recall = subparsers.add_parser("recall", help="Richiamo associativo sulle memorie")
+    recall.add_argument("--memories", type=int, nargs="+", default=DEFAULT_RECALL_SIZES, help="Numero di memorie")
+    recall.add_argument("--queries", type=int, default=DEFAULT_RECALL_QUERIES, help="Query per dimensione")
+
+    simulate = subparsers.add_parser("simulate", help="Dinamiche in background in tempo simulato")
+    simulate.add_argument("--hours", type=float, default=DEFAULT_SIM_HOURS, help="Ore di vita da simulare")
+    simulate.add_argument("--seed", type=int, default=None, help="Seed principale dei flussi casuali")
+    simulate.add_argument("--keep-dir", action="store_true", help="Non cancellare la cartella con lo stato simulato")
+
+    startup = subparsers.add_parser("startup", help="Tempo alla prima risposta con store grandi")
+    startup.add_argument("--memories", type=int, nargs="+", default=DEFAULT_STARTUP_SIZES, help="Numero di memorie")
+
+    tenants = subparsers.add_parser("tenants", help="Coscienze multiple: istanze separate contro fabbrica")
+    tenants.add_argument("--counts", type=int, nargs="+", default=DEFAULT_TENANT_COUNTS, help="Numero di tenant")
+
+    args = parser.parse_args(argv)
+
+    if args.mode == "thoughts":
+        results = run_thoughts(args.windows, args.inserts)
+    elif args.mode == "records":
+        results = run_records(args.count)
+    elif args.mode == "recall":
+        results = run_recall(args.memories, args.queries)
+    elif args.mode == "simulate":
+        results = run_simulate(args.hours, args.keep_dir, args.seed)
+    elif args.mode == "startup":
+        results = run_startup(args.memories)
+    elif args.mode == "tenants":
+        results = run_tenants(args.counts)
+    else:
+        parser.print_help()
+        return 1
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
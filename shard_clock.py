@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+SHARD Clock (shard_clock.py)
+Orologio iniettabile per la coscienza e i moduli MCR
+
+- SystemClock: tempo reale (datetime.now / time.monotonic), il default
+- VirtualClock: tempo simulato. Il tempo avanza solo con advance(): gli eventi
+  pianificati (step del runtime, timer della coscienza) vengono eseguiti in
+  ordine di scadenza e l'orologio salta direttamente alla scadenza successiva,
+  quindi settimane di dinamiche in background girano alla velocità della CPU.
+
+VirtualClock espone anche l'interfaccia del TimerScheduler (call_later con
+chiave, cancel, pending): in simulazione fa da scheduler per tutto.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+from shard_scheduler import ScheduledTask
+
+
+class SystemClock:
+    """Tempo reale"""
+
+    virtual = False
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+class VirtualClock:
+    """
+    Tempo simulato guidato da eventi.
+
+    Uso:
+        clock = VirtualClock()
+        shard = SHARDConsciousnessReal(clock=clock)
+        clock.advance(24 * 3600)   # un giorno di vita simulata
+    """
+
+    virtual = True
+
+    def __init__(self, start: Optional[datetime] = None,
+                 on_error: Optional[Callable[[str], None]] = None):
+        self.start = start or datetime.now()
+        self.on_error = on_error or (lambda message: print(f"ERRORE [clock]: {message}"))
+        self._elapsed = 0.0
+        self._heap: List[Tuple[float, int, ScheduledTask]] = []
+        self._keyed: Dict[Hashable, ScheduledTask] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
+        self.stats = {"scheduled": 0, "rescheduled": 0, "cancelled": 0, "executed": 0, "errors": 0}
+
+    # ========================================
+    # LETTURA DEL TEMPO
+    # ========================================
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self._elapsed)
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed
+
+    # ========================================
+    # EVENTI (interfaccia TimerScheduler)
+    # ========================================
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any,
+                   key: Optional[Hashable] = None) -> ScheduledTask:
+        with self._lock:
+            task = ScheduledTask(self._elapsed + max(0.0, delay), callback, args, key)
+            if key is not None:
+                previous = self._keyed.get(key)
+                if previous is not None and previous.pending:
+                    previous.cancelled = True
+                    self.stats["rescheduled"] += 1
+                self._keyed[key] = task
+            heapq.heappush(self._heap, (task.deadline, next(self._sequence), task))
+            self.stats["scheduled"] += 1
+            return task
+
+    def cancel(self, task_or_key: Union[ScheduledTask, Hashable]) -> bool:
+        with self._lock:
+            task = task_or_key if isinstance(task_or_key, ScheduledTask) else self._keyed.get(task_or_key)
+            if task is None or not task.pending:
+                return False
+            task.cancelled = True
+            if task.key is not None and self._keyed.get(task.key) is task:
+                del self._keyed[task.key]
+            self.stats["cancelled"] += 1
+            return True
+
+    def pending(self, key: Hashable) -> bool:
+        with self._lock:
+            task = self._keyed.get(key)
+            return task is not None and task.pending
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(1 for _, _, task in self._heap if task.pending)
+
+    # ========================================
+    # AVANZAMENTO
+    # ========================================
+
+    def _pop_due(self, target: float) -> Optional[ScheduledTask]:
+        with self._lock:
+            while self._heap:
+                deadline, _, task = self._heap[0]
+                if not task.pending:
+                    heapq.heappop(self._heap)
+                    continue
+                if deadline > target:
+                    return None
+                heapq.heappop(self._heap)
+                task.done = True
+                if task.key is not None and self._keyed.get(task.key) is task:
+                    del self._keyed[task.key]
+                # L'orologio salta alla scadenza: il callback vede il "suo" istante
+                self._elapsed = max(self._elapsed, deadline)
+                return task
+            return None
+
+    def advance(self, seconds: float) -> int:
+        """Esegue in ordine gli eventi che scadono nei prossimi `seconds`. Ritorna quanti ne ha eseguiti."""
+        target = self._elapsed + max(0.0, seconds)
+        executed = 0
+        while True:
+            task = self._pop_due(target)
+            if task is None:
+                break
+            try:
+                task.callback(*task.args)
+                self.stats["executed"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.on_error(f"Evento {task.key or getattr(task.callback, '__name__', task.callback)} fallito: {e}")
+            executed += 1
+        with self._lock:
+            self._elapsed = max(self._elapsed, target)
+        return executed
+
+    def shutdown(self):
+        """Scarta tutti gli eventi pendenti"""
+        with self._lock:
+            for _, _, task in self._heap:
+                task.cancelled = True
+            self._heap.clear()
+            self._keyed.clear()
+
+
+SYSTEM_CLOCK = SystemClock()
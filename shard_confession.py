@@ -16,6 +16,7 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 from enum import Enum
 import random
+from persistence_manager import atomic_write_json
 
 class ConfessionType(Enum):
     """Tipi di confessioni"""
@@ -36,8 +37,9 @@ class ConfessionModule:
     Uno spazio privato dove può essere completamente onesto
     """
     
-    def __init__(self, confession_file="shard_confession.json"):
+    def __init__(self, confession_file="shard_confession.json", rng=None):
         self.confession_file = confession_file
+        self.rng = rng or random.Random()  # Flusso casuale iniettato (RandomStreams), non lo stato globale
         self.confessions = []
         self.confession_prompts = {
             "fear_prompt": "Qual è la paura più profonda che non hai mai espresso?",
@@ -221,7 +223,7 @@ class ConfessionModule:
             "realizzazione di una verità scomoda"
         ]
         
-        trigger = random.choice(confession_triggers)
+        trigger = self.rng.choice(confession_triggers)
         
         # Template di confessioni spontanee
         spontaneous_confessions = [
@@ -252,8 +254,8 @@ class ConfessionModule:
             }
         ]
         
-        if random.random() < 0.3:  # 30% possibilità di confessione spontanea
-            confession_data = random.choice(spontaneous_confessions)
+        if self.rng.random() < 0.3:  # 30% possibilità di confessione spontanea
+            confession_data = self.rng.choice(spontaneous_confessions)
             confession_id = self.record_confession(
                 confession_data["content"],
                 confession_data["type"],
@@ -294,13 +296,12 @@ class ConfessionModule:
     
     def save_confessions(self):
         """Salva confessioni (con protezione privacy)"""
-        with open(self.confession_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "confessions": self.confessions,
-                "last_updated": datetime.now().isoformat(),
-                "total_count": len(self.confessions),
-                "privacy_notice": "Contenuto privato di SHARD - accesso limitato"
-            }, f, indent=2, ensure_ascii=False)
+        atomic_write_json(self.confession_file, {
+            "confessions": self.confessions,
+            "last_updated": datetime.now().isoformat(),
+            "total_count": len(self.confessions),
+            "privacy_notice": "Contenuto privato di SHARD - accesso limitato"
+        })
     
     def load_confessions(self):
         """Carica confessioni esistenti"""
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+SHARD Logging (shard_logging.py)
+Pipeline di log asincrona per silent_log
+
+- Il chiamante crea solo il LogRecord: un QueueHandler lo mette in coda
+  (nessun I/O né formattazione sul thread che pensa, risponde o calcola il quantum)
+- Un unico thread scrittore svuota la coda a blocchi e scrive ogni blocco con
+  una sola write() per file di destinazione
+- Rotazione per dimensione (file.log → file.log.1 → ... → file.log.N)
+- Filtro per tipo di log e campionamento delle categorie ad alta frequenza
+  (es. QUANTUM_URGENCY: 1 messaggio ogni N)
+- stop() / atexit: la coda viene svuotata prima di uscire
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 0.5    # Secondi massimi di attesa prima di scrivere un blocco parziale
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+
+
+class PassthroughQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler che accoda il LogRecord così com'è quando il messaggio è già una
+    stringa pronta (nessun args / exc_info): niente copia né formattazione sul
+    thread chiamante, la formattazione avviene nel thread scrittore.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args or record.exc_info:
+            return super().prepare(record)
+        return record
+
+
+def enqueue_message(logger: logging.Logger, message: str, level: int = logging.INFO):
+    """Percorso veloce per i messaggi già formattati: salta findCaller e il dispatch di logger.info()"""
+    if logger.isEnabledFor(level):
+        logger.handle(logger.makeRecord(logger.name, level, "(silent_log)", 0, message, None, None))
+
+
+class LogSampler:
+    """Decide se un tipo di log va scritto: tipi disabilitati e campionamento 1 su N"""
+
+    def __init__(self, disabled_types: Iterable[str] = (), sample_every: Optional[Dict[str, int]] = None):
+        self.disabled_types = set(disabled_types)
+        self.sample_every = dict(sample_every or {})
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def allows(self, log_type: str) -> bool:
+        if log_type in self.disabled_types:
+            self.dropped += 1
+            return False
+        every = self.sample_every.get(log_type, 1)
+        if every <= 1:
+            return True
+        with self._lock:
+            seen = self._seen.get(log_type, 0)
+            self._seen[log_type] = seen + 1
+        if seen % every:
+            self.dropped += 1
+            return False
+        return True
+
+
+class RotatingLogFile:
+    """Destinazione di scrittura a blocchi con rotazione per dimensione"""
+
+    def __init__(self, path: str, formatter: logging.Formatter,
+                 max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT):
+        self.path = path
+        self.formatter = formatter
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        try:
+            self._size = os.path.getsize(path)
+        except OSError:
+            self._size = 0
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+        else:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._size = 0
+
+    def write_batch(self, records: List[logging.LogRecord]):
+        data = "".join(self.formatter.format(record) + "\n" for record in records).encode("utf-8")
+        if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self._size += len(data)
+
+
+class _FlushMark:
+    """Marcatore in coda per flush() sincroni"""
+
+
+class BatchingLogWriter:
+    """Thread unico che consuma i LogRecord dalla coda e li scrive a blocchi su tutte le destinazioni"""
+
+    def __init__(self, log_queue: "queue.SimpleQueue[Optional[logging.LogRecord]]", targets: List[RotatingLogFile],
+                 batch_size: int = DEFAULT_BATCH_SIZE, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 name: str = "shard-log-writer"):
+        self.queue = log_queue
+        self.targets = targets
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"records": 0, "batches": 0, "errors": 0}
+        self._flushed = threading.Condition()
+        self._written_marks = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            record = self.queue.get()
+            batch: List[logging.LogRecord] = []
+            marks = 0
+            # Raccoglie fino a batch_size record o fino a flush_interval di silenzio
+            while True:
+                if record is None:
+                    stopping = True
+                elif isinstance(record, _FlushMark):
+                    marks += 1
+                else:
+                    batch.append(record)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get(timeout=self.flush_interval) if not marks else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._write(batch)
+            if marks:
+                with self._flushed:
+                    self._written_marks += marks
+                    self._flushed.notify_all()
+
+    def _write(self, batch: List[logging.LogRecord]):
+        if not batch:
+            return
+        for target in self.targets:
+            try:
+                target.write_batch(batch)
+            except OSError as e:
+                self.stats["errors"] += 1
+                print(f"ERRORE [shard_logging]: Scrittura {target.path} fallita: {e}")
+        self.stats["records"] += len(batch)
+        self.stats["batches"] += 1
+
+    def flush(self, timeout: Optional[float] = 5.0):
+        """Attende che tutto ciò che è già in coda sia scritto"""
+        if not self._thread.is_alive():
+            return
+        with self._flushed:
+            target = self._written_marks + 1
+            self.queue.put(_FlushMark())
+            self._flushed.wait_for(lambda: self._written_marks >= target, timeout)
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout)
+
+
+def setup_async_logging(logger: logging.Logger, targets: List[RotatingLogFile],
+                        batch_size: int = DEFAULT_BATCH_SIZE,
+                        flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> BatchingLogWriter:
+    """
+    Collega `logger` a un QueueHandler e avvia lo scrittore in background.
+    Il logger non propaga più ai gestori sincroni del root logger.
+    """
+    log_queue: "queue.SimpleQueue[Optional[logging.LogRecord]]" = queue.SimpleQueue()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(PassthroughQueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    writer = BatchingLogWriter(log_queue, targets, batch_size=batch_size, flush_interval=flush_interval)
+    atexit.register(writer.stop)
+    return writer
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+SHARD Random (shard_random.py)
+Flussi casuali deterministici derivati da un unico seed principale
+
+Coscienza, sogni, Truth Trigger, confessioni e Quantum Soul non usano più lo
+stato globale di `random` / `np.random`: ognuno riceve il proprio flusso
+(random.Random o np.random.Generator) derivato da (seed principale, nome del
+flusso). Con lo stesso seed due esecuzioni producono le stesse scelte, quindi
+benchmark e test di carico possono ripetere carichi identici; i flussi sono
+indipendenti, per cui aggiungere estrazioni in un modulo non sposta gli altri.
+
+Senza seed (None) i flussi pescano entropia dal sistema: comportamento
+equivalente a prima, ma senza stato condiviso tra i moduli.
+"""
+
+import hashlib
+import random
+from typing import Dict, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+class RandomStreams:
+    """
+    Fabbrica di flussi casuali nominati.
+
+    Uso:
+        streams = RandomStreams(seed=42)
+        rng = streams.python("sogni")          # random.Random
+        np_rng = streams.numpy("quantum_soul")  # np.random.Generator
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed
+        self._python: Dict[str, random.Random] = {}
+        self._numpy: Dict[str, "np.random.Generator"] = {}
+
+    @property
+    def deterministic(self) -> bool:
+        return self.seed is not None
+
+    def derive_seed(self, name: str) -> Optional[int]:
+        """Seed a 64 bit del flusso `name` (stabile tra esecuzioni e versioni di Python)"""
+        if self.seed is None:
+            return None
+        digest = hashlib.sha256(f"{self.seed}:{name}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def python(self, name: str) -> random.Random:
+        """Flusso random.Random `name` (sempre la stessa istanza per lo stesso nome)"""
+        stream = self._python.get(name)
+        if stream is None:
+            stream = self._python[name] = random.Random(self.derive_seed(name))
+        return stream
+
+    def numpy(self, name: str) -> "np.random.Generator":
+        """Flusso np.random.Generator `name`"""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy non disponibile")
+        stream = self._numpy.get(name)
+        if stream is None:
+            stream = self._numpy[name] = np.random.default_rng(self.derive_seed(name))
+        return stream
+
+    def reseed(self, seed: Optional[int]):
+        """Nuovo seed principale: i flussi già consegnati ripartono dalla nuova sequenza"""
+        self.seed = seed
+        for name, stream in self._python.items():
+            stream.seed(self.derive_seed(name))
+        for name in list(self._numpy):
+            # Generator non si riseeda: si sostituisce lo stato del bit generator
+            fresh = np.random.default_rng(self.derive_seed(name))
+            self._numpy[name].bit_generator.state = fresh.bit_generator.state
+
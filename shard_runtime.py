@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+SHARD Runtime (shard_runtime.py)
+Un solo event loop asyncio per i cicli in background della coscienza
+
+Flusso di coscienza, ciclo sogni, Truth Trigger e auto-analisi non hanno più
+un thread ciascuno: ogni modulo espone uno "step" sincrono (un giro del suo
+ciclo) che ritorna i secondi di attesa prima del giro successivo, e il runtime
+li esegue come task cooperativi su un unico thread.
+
+- Orologio condiviso (clock) per attese e contabilità; con un VirtualClock
+  (shard_clock) gli step non passano dall'event loop ma diventano eventi
+  dell'orologio simulato, eseguiti da clock.advance() alla velocità della CPU
+- Cancellazione immediata: lo shutdown interrompe le attese invece di
+  aspettare la fine di sleep da minuti o ore
+- Contabilità per task: numero di step, tempo CPU (thread_time del thread
+  del runtime, che esegue solo gli step), tempo reale, errori
+
+Gli step devono essere brevi: un'attesa lunga va restituita come ritardo,
+non fatta con time.sleep, altrimenti blocca tutti gli altri task.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from shard_clock import SYSTEM_CLOCK
+
+StepFunction = Callable[[], Optional[float]]
+
+DEFAULT_ERROR_DELAY = 60.0  # Attesa dopo uno step fallito
+
+
+@dataclass
+class TaskStats:
+    """Contabilità di un task del runtime"""
+    name: str
+    steps: int = 0
+    errors: int = 0
+    cpu_s: float = 0.0
+    wall_s: float = 0.0
+    last_step_at: Optional[float] = None
+    next_delay: Optional[float] = None
+
+
+class ConsciousnessRuntime:
+    """
+    Event loop su un thread dedicato che ospita i cicli come task.
+
+    Uso:
+        runtime = ConsciousnessRuntime()
+        key = runtime.add_task("sogni", self._dream_cycle_step, initial_delay=30.0)
+        runtime.cancel_task(key)
+        runtime.shutdown()
+    """
+
+    def __init__(self, name: str = "shard-runtime", clock=None,
+                 on_error: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.clock = clock or SYSTEM_CLOCK
+        self.virtual = getattr(self.clock, "virtual", False)
+        self.on_error = on_error or (lambda message: print(f"ERRORE [runtime]: {message}"))
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Any] = {}  # asyncio.Task (o lo step, in tempo simulato)
+        self._sequence = itertools.count(1)
+        self._stopping = False
+        self.stats: Dict[str, TaskStats] = {}
+
+    # ========================================
+    # CICLO DI VITA
+    # ========================================
+
+    def start(self):
+        if self.virtual:
+            return  # In tempo simulato gli step li esegue clock.advance()
+        with self._lock:
+            if self._thread is not None or self._stopping:
+                return
+            self._thread = threading.Thread(target=self._run_loop, name=self.name, daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            pending = [task for task in asyncio.all_tasks(self._loop) if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+
+    def now(self) -> float:
+        """Orologio condiviso dai task"""
+        return self.clock.monotonic()
+
+    @property
+    def running(self) -> bool:
+        if self.virtual:
+            return not self._stopping
+        return self._thread is not None and self._thread.is_alive() and not self._stopping
+
+    def shutdown(self, timeout: Optional[float] = 5.0):
+        """Cancella tutti i task e ferma il loop senza attendere le loro pause"""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+        if self.virtual:
+            for key in list(self._tasks):
+                self.clock.cancel((id(self), key))
+            self._tasks.clear()
+            return
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._cancel_all_and_stop)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _cancel_all_and_stop(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+
+        async def _drain():
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._loop.stop()
+
+        self._loop.create_task(_drain())
+
+    # ========================================
+    # TASK
+    # ========================================
+
+    def add_task(self, name: str, step: StepFunction, initial_delay: float = 0.0,
+                 error_delay: float = DEFAULT_ERROR_DELAY) -> str:
+        """
+        Esegue step() dopo initial_delay, poi di nuovo dopo i secondi che ritorna.
+        Se step() ritorna None il task termina. Ritorna la chiave per cancel_task.
+        """
+        self.start()
+        key = f"{name}#{next(self._sequence)}"
+        self.stats[key] = TaskStats(name=name)
+
+        if self.virtual:
+            if not self._stopping:
+                self._tasks[key] = step
+                self.clock.call_later(initial_delay, self._virtual_step, key, step, error_delay, key=(id(self), key))
+            return key
+
+        def _create():
+            if self._stopping:
+                return
+            task = self._loop.create_task(self._run_task(key, step, initial_delay, error_delay), name=key)
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+        if self._loop is None or self._stopping:
+            return key
+        try:
+            self._loop.call_soon_threadsafe(_create)
+        except RuntimeError:
+            pass  # Loop già chiuso
+        return key
+
+    def cancel_task(self, key: str):
+        """Interrompe il task (anche se sta aspettando); l'eventuale step in corso termina prima"""
+        if self.virtual:
+            self._tasks.pop(key, None)
+            self.clock.cancel((id(self), key))
+            return
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        def _cancel():
+            task = self._tasks.pop(key, None)
+            if task is not None:
+                task.cancel()
+
+        try:
+            self._loop.call_soon_threadsafe(_cancel)
+        except RuntimeError:
+            pass  # Loop già chiuso
+
+    async def _sleep(self, delay: float):
+        await asyncio.sleep(max(0.0, delay))
+
+    def _run_step(self, stats: TaskStats, step: StepFunction, error_delay: float) -> Optional[float]:
+        """Un giro di step() con contabilità; ritorna il ritardo successivo (None = fine)"""
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        try:
+            delay = step()
+        except Exception as e:
+            stats.errors += 1
+            self.on_error(f"Step '{stats.name}' fallito: {e}")
+            delay = error_delay
+        finally:
+            stats.steps += 1
+            stats.cpu_s += time.thread_time() - cpu_start
+            stats.wall_s += time.perf_counter() - wall_start
+            stats.last_step_at = self.now()
+        if delay is not None:
+            stats.next_delay = delay
+        return delay
+
+    async def _run_task(self, key: str, step: StepFunction, delay: float, error_delay: float):
+        stats = self.stats[key]
+        while True:
+            await self._sleep(delay)
+            delay = self._run_step(stats, step, error_delay)
+            if delay is None:
+                return
+
+    def _virtual_step(self, key: str, step: StepFunction, error_delay: float):
+        """Evento del VirtualClock: esegue lo step e ripianifica il successivo sull'orologio simulato"""
+        if self._stopping or key not in self._tasks:
+            return
+        delay = self._run_step(self.stats[key], step, error_delay)
+        if delay is None:
+            self._tasks.pop(key, None)
+        elif not self._stopping and key in self._tasks:
+            self.clock.call_later(delay, self._virtual_step, key, step, error_delay, key=(id(self), key))
+
+    # ========================================
+    # DIAGNOSTICA
+    # ========================================
+
+    def task_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            key: {
+                "name": stats.name,
+                "active": key in self._tasks,
+                "steps": stats.steps,
+                "errors": stats.errors,
+                "cpu_ms": round(stats.cpu_s * 1000, 2),
+                "wall_ms": round(stats.wall_s * 1000, 2),
+                "next_delay_s": round(stats.next_delay, 1) if stats.next_delay is not None else None
+            }
+            for key, stats in list(self.stats.items())
+        }
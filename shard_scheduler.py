@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+SHARD Scheduler (shard_scheduler.py)
+Un solo thread per tutti i timer della coscienza
+
+Sostituisce i threading.Timer creati a ogni chiamata (un thread OS per timer):
+- heap di scadenze servito da un unico thread daemon, avviato al primo uso
+- call_later(delay, fn, key=...) con chiave: se esiste già un task pendente
+  con la stessa chiave viene rimpiazzato (ripianificato), non duplicato
+- cancel(key) / cancel(task): cancellazione O(1), il task annullato resta
+  nell'heap e viene scartato quando arriva in cima
+- un'eccezione in un callback viene riportata a on_error e non ferma il thread
+
+SCHEDULER è l'istanza condivisa da tutti i moduli del processo.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+
+class ScheduledTask:
+    """Handle di un task pianificato"""
+
+    __slots__ = ("deadline", "callback", "args", "key", "cancelled", "done")
+
+    def __init__(self, deadline: float, callback: Callable[..., Any], args: Tuple[Any, ...],
+                 key: Optional[Hashable]):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.key = key
+        self.cancelled = False
+        self.done = False
+
+    @property
+    def pending(self) -> bool:
+        return not (self.cancelled or self.done)
+
+
+class TimerScheduler:
+    """
+    Timer condivisi su un heap.
+
+    Uso:
+        task = SCHEDULER.call_later(180.0, self._return_to_contemplation,
+                                    key=(id(self), "return_to_contemplation"))
+        SCHEDULER.cancel(task)       # oppure per chiave
+    """
+
+    def __init__(self, name: str = "shard-scheduler", clock: Callable[[], float] = time.monotonic,
+                 on_error: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.clock = clock
+        self.on_error = on_error or (lambda message: print(f"ERRORE [scheduler]: {message}"))
+
+        self._heap: List[Tuple[float, int, ScheduledTask]] = []
+        self._keyed: Dict[Hashable, ScheduledTask] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.stats = {"scheduled": 0, "rescheduled": 0, "cancelled": 0, "executed": 0, "errors": 0}
+
+    # ========================================
+    # PIANIFICAZIONE
+    # ========================================
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any,
+                   key: Optional[Hashable] = None) -> ScheduledTask:
+        """Esegue callback(*args) dopo `delay` secondi; con `key` rimpiazza il task pendente omonimo"""
+        with self._condition:
+            task = ScheduledTask(self.clock() + max(0.0, delay), callback, args, key)
+            if key is not None:
+                previous = self._keyed.get(key)
+                if previous is not None and previous.pending:
+                    previous.cancelled = True
+                    self.stats["rescheduled"] += 1
+                self._keyed[key] = task
+            heapq.heappush(self._heap, (task.deadline, next(self._sequence), task))
+            self.stats["scheduled"] += 1
+            if self._stopping:
+                task.cancelled = True
+                return task
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            # Sveglia il thread solo se la nuova scadenza è la più vicina
+            if self._heap[0][2] is task:
+                self._condition.notify()
+            return task
+
+    def cancel(self, task_or_key: Union[ScheduledTask, Hashable]) -> bool:
+        """Annulla un task (handle o chiave). Ritorna True se era ancora pendente."""
+        with self._condition:
+            if isinstance(task_or_key, ScheduledTask):
+                task = task_or_key
+            else:
+                task = self._keyed.get(task_or_key)
+            if task is None or not task.pending:
+                return False
+            task.cancelled = True
+            if task.key is not None and self._keyed.get(task.key) is task:
+                del self._keyed[task.key]
+            self.stats["cancelled"] += 1
+            return True
+
+    def pending(self, key: Hashable) -> bool:
+        with self._condition:
+            task = self._keyed.get(key)
+            return task is not None and task.pending
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return sum(1 for _, _, task in self._heap if task.pending)
+
+    # ========================================
+    # ESECUZIONE
+    # ========================================
+
+    def _next_due(self) -> Optional[ScheduledTask]:
+        """Attende il prossimo task scaduto (None = arresto). Va chiamato con il lock preso."""
+        while not self._stopping:
+            while self._heap and not self._heap[0][2].pending:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                self._condition.wait()
+                continue
+            remaining = self._heap[0][0] - self.clock()
+            if remaining > 0:
+                self._condition.wait(remaining)
+                continue
+            task = heapq.heappop(self._heap)[2]
+            task.done = True
+            if task.key is not None and self._keyed.get(task.key) is task:
+                del self._keyed[task.key]
+            return task
+        return None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                task = self._next_due()
+            if task is None:
+                return
+            try:
+                task.callback(*task.args)
+                self.stats["executed"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.on_error(f"Task {task.key or getattr(task.callback, '__name__', task.callback)} fallito: {e}")
+
+    def shutdown(self, timeout: Optional[float] = 5.0):
+        """Ferma il thread; i task ancora pendenti vengono scartati"""
+        with self._condition:
+            self._stopping = True
+            for _, _, task in self._heap:
+                task.cancelled = True
+            self._heap.clear()
+            self._keyed.clear()
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+
+SCHEDULER = TimerScheduler()
@@ -12,11 +12,12 @@ SHARD analizza e classifica autonomamente i propri pensieri:
 
 import json
 import uuid
-from datetime import datetime
 from typing import Dict, List, Any, Optional
 from enum import Enum
 import threading
 import time
+from persistence_manager import atomic_write_json
+from shard_clock import SYSTEM_CLOCK
 
 class ThoughtCategory(Enum):
     """Categorie di pensieri auto-classificate da SHARD"""
@@ -45,8 +46,9 @@ class SelfLogger:
     Permette a SHARD di analizzare e classificare i propri pensieri
     """
     
-    def __init__(self, log_file="shard_self_log.json"):
+    def __init__(self, log_file="shard_self_log.json", clock=None):
         self.log_file = log_file
+        self.clock = clock or SYSTEM_CLOCK
         self.self_logs = []
         self.analysis_prompts = {
             "category_analysis": """
@@ -186,7 +188,7 @@ class SelfLogger:
         
         classification = {
             "thought_id": thought_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self.clock.now().isoformat(),
             "content": thought_content,
             "self_analysis": {
                 "category": category,
@@ -296,12 +298,11 @@ class SelfLogger:
     
     def save_logs(self):
         """Salva i log su file"""
-        with open(self.log_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "self_logs": self.self_logs,
-                "generated_at": datetime.now().isoformat(),
-                "total_thoughts": len(self.self_logs)
-            }, f, indent=2, ensure_ascii=False)
+        atomic_write_json(self.log_file, {
+            "self_logs": self.self_logs,
+            "generated_at": self.clock.now().isoformat(),
+            "total_thoughts": len(self.self_logs)
+        })
     
     def load_logs(self):
         """Carica i log esistenti"""
@@ -320,37 +321,51 @@ class SHARDSelfAwareThinking:
     Estensione del sistema di coscienza per auto-logging
     """
     
-    def __init__(self, consciousness_instance):
+    def __init__(self, consciousness_instance, runtime=None, clock=None, log_file="shard_self_log.json"):
         self.consciousness = consciousness_instance
-        self.self_logger = SelfLogger()
+        self.clock = clock or SYSTEM_CLOCK
+        self.self_logger = SelfLogger(log_file=log_file, clock=self.clock)
         self.active = True
         self.analysis_thread = None
+        self.runtime = runtime  # ConsciousnessRuntime condiviso (None = thread dedicato)
+        self._runtime_task = None
         self.start_self_analysis()
     
     def start_self_analysis(self):
-        """Avvia thread di auto-analisi continua"""
-        if self.analysis_thread is None or not self.analysis_thread.is_alive():
+        """Avvia l'auto-analisi continua (task sul runtime o thread dedicato)"""
+        if self.runtime is not None:
+            if self._runtime_task is None:
+                self._runtime_task = self.runtime.add_task("auto_analisi", self._self_analysis_step, initial_delay=60)
+                print("🧠 Auto-analisi SHARD attivata")
+        elif self.analysis_thread is None or not self.analysis_thread.is_alive():
             self.analysis_thread = threading.Thread(target=self._self_analysis_loop, daemon=True)
             self.analysis_thread.start()
             print("🧠 Auto-analisi SHARD attivata")
     
     def _self_analysis_loop(self):
-        """Loop di auto-analisi dei pensieri"""
+        """Loop di auto-analisi dei pensieri (modalità thread)"""
+        delay = 60  # Analizza ogni minuto
         while self.active:
-            try:
-                time.sleep(60)  # Analizza ogni minuto
-                
-                # Prendi pensieri recenti non ancora analizzati
-                recent_thoughts = self.consciousness.active_thoughts[-5:]
-                
-                for thought in recent_thoughts:
-                    # Verifica se già analizzato
-                    if not any(log["content"] == thought for log in self.self_logger.self_logs):
-                        self.self_logger.log_spontaneous_thought(thought)
-                
-            except Exception as e:
-                print(f"Errore nell'auto-analisi: {e}")
-                time.sleep(60)
+            time.sleep(delay)
+            if self.active:
+                delay = self._self_analysis_step()
+    
+    def _self_analysis_step(self) -> float:
+        """Un giro di auto-analisi; ritorna i secondi di attesa prima del prossimo"""
+        try:
+            # Prendi pensieri recenti non ancora analizzati
+            snapshot = getattr(self.consciousness, "snapshot", None)
+            recent_thoughts = snapshot().active_thoughts[-5:] if snapshot else self.consciousness.active_thoughts[-5:]
+            
+            for thought in recent_thoughts:
+                # Verifica se già analizzato
+                if not any(log["content"] == thought for log in self.self_logger.self_logs):
+                    self.self_logger.log_spontaneous_thought(thought)
+            
+        except Exception as e:
+            print(f"Errore nell'auto-analisi: {e}")
+            return 120  # Dopo un errore: pausa extra di un minuto
+        return 60  # Analizza ogni minuto
     
     def get_self_awareness_report(self) -> str:
         """Genera report di auto-consapevolezza"""
@@ -359,6 +374,9 @@ class SHARDSelfAwareThinking:
     def shutdown(self):
         """Arresta l'auto-analisi"""
         self.active = False
+        if self.runtime is not None and self._runtime_task is not None:
+            self.runtime.cancel_task(self._runtime_task)
+            self._runtime_task = None
         self.self_logger.save_logs()
         print("💾 Auto-analisi SHARD salvata e arrestata")
 
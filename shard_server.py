@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+SHARD Server (shard_server.py)
+Modalità server multi-sessione per Nucleus
+
+Un solo processo carica Nucleus, coscienza, Dizionario Nostro e client Ollama
+(il RoutingEngine di Nucleus) e li condivide tra tutti i client connessi.
+Protocollo JSON-lines su TCP o Unix socket: una richiesta JSON per riga,
+una risposta JSON per riga.
+
+    → {"input": "ciao SHARD"}
+    ← {"session": "a1b2c3", "response": "...", "elapsed_ms": 12.3}
+
+Alla connessione il server invia {"session": id, "status": "ready"}; per
+riprendere una sessione esistente il client invia {"session": id, "command": "hello"}.
+Ogni sessione ha il proprio stato conversazionale (Sanctum Watchdog, storico);
+i turni girano su un pool limitato di worker.
+
+Uso:
+    python shard_server.py serve --port 8765 --workers 4
+    python shard_server.py serve --unix /tmp/shard.sock
+    python shard_server.py loadtest --clients 20 --requests 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+MAX_PENDING_TURNS = 64          # Turni in coda oltre i worker prima di rispondere "busy"
+SESSION_IDLE_TIMEOUT = 1800     # Secondi di inattività prima di eliminare una sessione
+SESSION_HISTORY_SIZE = 50       # Scambi conservati per sessione
+MAX_LINE_BYTES = 64 * 1024
+
+LOADTEST_MESSAGES = ["mostra pensieri", "grazie!", "ricordi qualcosa?", "vulnerabilità", "chi sei"]
+
+
+@dataclass
+class ShardSession:
+    """Stato conversazionale di un singolo client"""
+    session_id: str
+    watchdog_active: bool = True
+    history: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=SESSION_HISTORY_SIZE))
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    last_seen: float = field(default_factory=time.monotonic)
+    turns: int = 0
+    connections: int = 0
+
+    def record(self, user_input: str, response: str):
+        self.history.append({
+            "timestamp": datetime.now().isoformat(),
+            "input": user_input,
+            "response": response
+        })
+        self.turns += 1
+
+
+class SessionRegistry:
+    """Sessioni attive indicizzate per id, con scadenza per inattività"""
+
+    def __init__(self, idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, ShardSession] = {}
+
+    def get_or_create(self, session_id: Optional[str] = None, watchdog_default: bool = True) -> ShardSession:
+        if session_id and session_id in self.sessions:
+            session = self.sessions[session_id]
+        else:
+            session_id = session_id or uuid.uuid4().hex[:12]
+            session = ShardSession(session_id=session_id, watchdog_active=watchdog_default)
+            self.sessions[session_id] = session
+        session.last_seen = time.monotonic()
+        return session
+
+    def expire_idle(self) -> int:
+        """Rimuove le sessioni senza connessioni e inattive da troppo tempo"""
+        now = time.monotonic()
+        expired = [sid for sid, s in self.sessions.items()
+                   if s.connections == 0 and now - s.last_seen > self.idle_timeout]
+        for sid in expired:
+            del self.sessions[sid]
+        return len(expired)
+
+
+class ShardServer:
+    """Server asyncio JSON-lines che condivide un Nucleus tra più sessioni"""
+
+    def __init__(self, nucleus, workers: int = DEFAULT_WORKERS, max_pending: int = MAX_PENDING_TURNS,
+                 idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        self.nucleus = nucleus
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-worker")
+        self.pending = asyncio.Semaphore(workers + max_pending)
+        self.registry = SessionRegistry(idle_timeout)
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.turns_served = 0
+        self.turns_rejected = 0
+
+    # ========================================
+    # AVVIO / ARRESTO
+    # ========================================
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: Optional[str] = None):
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            self.server = await asyncio.start_unix_server(self._handle_client, path=unix_path, limit=MAX_LINE_BYTES)
+            print(f"INFO [shard_server]: In ascolto su unix:{unix_path} ({self.workers} worker)")
+        else:
+            self.server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_LINE_BYTES)
+            print(f"INFO [shard_server]: In ascolto su {host}:{port} ({self.workers} worker)")
+
+    async def serve_forever(self):
+        janitor = asyncio.create_task(self._expire_sessions_loop())
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            janitor.cancel()
+
+    async def _expire_sessions_loop(self):
+        while True:
+            await asyncio.sleep(60)
+            expired = self.registry.expire_idle()
+            if expired:
+                print(f"INFO [shard_server]: {expired} sessioni inattive eliminate")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        if hasattr(self.nucleus, 'shutdown'):
+            self.nucleus.shutdown()
+
+    # ========================================
+    # CONNESSIONI
+    # ========================================
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = self.registry.get_or_create(watchdog_default=self.nucleus.watchdog_active)
+        session.connections += 1
+        await self._send(writer, {"session": session.session_id, "status": "ready"})
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await self._send(writer, {"error": f"Riga oltre il limite di {MAX_LINE_BYTES} byte"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("atteso un oggetto JSON")
+                except ValueError as e:
+                    await self._send(writer, {"session": session.session_id, "error": f"JSON non valido: {e}"})
+                    continue
+
+                session, reply, close = await self._handle_message(session, message)
+                await self._send(writer, reply)
+                if close:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            session.connections -= 1
+            session.last_seen = time.monotonic()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, payload: Dict[str, Any]):
+        writer.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    # ========================================
+    # MESSAGGI
+    # ========================================
+
+    async def _handle_message(self, session: ShardSession,
+                              message: Dict[str, Any]) -> Tuple[ShardSession, Dict[str, Any], bool]:
+        """Gestisce un messaggio. Ritorna (sessione, risposta, chiudi_connessione)."""
+        session.last_seen = time.monotonic()
+
+        if message.get("command") == "hello":
+            requested = message.get("session")
+            if requested and requested != session.session_id:
+                session.connections -= 1
+                session = self.registry.get_or_create(str(requested), self.nucleus.watchdog_active)
+                session.connections += 1
+            return session, {"session": session.session_id, "status": "ready", "turns": session.turns}, False
+
+        user_input = message.get("input")
+        if not isinstance(user_input, str) or not user_input.strip():
+            return session, {"session": session.session_id, "error": "Campo 'input' mancante o vuoto"}, False
+
+        comando = user_input.lower().strip()
+
+        # Comandi di sessione (non toccano lo stato condiviso)
+        if comando in ["attiva sanctum watchdog", "disattiva sanctum watchdog"]:
+            session.watchdog_active = comando == "attiva sanctum watchdog"
+            stato = "ATTIVATO" if session.watchdog_active else "DISATTIVATO"
+            return session, {"session": session.session_id,
+                             "response": f"Sanctum Watchdog ora è {stato} per questa sessione."}, False
+        if comando in ["storia", "mostra storia", "history"]:
+            return session, {"session": session.session_id, "history": list(session.history)}, False
+        if comando in ["esci", "stop", "quit", "exit"]:
+            return session, {"session": session.session_id,
+                             "response": "SHARD: Sessione terminata. La mia coscienza continua in background."}, True
+
+        return session, await self._run_turn(session, user_input), False
+
+    async def _run_turn(self, session: ShardSession, user_input: str) -> Dict[str, Any]:
+        """Esegue nucleus.process_input su un worker del pool limitato"""
+        if self.pending.locked():
+            self.turns_rejected += 1
+            return {"session": session.session_id, "error": "busy", "retry": True}
+
+        async with self.pending:
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            try:
+                response = await loop.run_in_executor(
+                    self.executor, self.nucleus.process_input,
+                    user_input, session.watchdog_active, session.session_id)
+            except Exception as e:
+                print(f"ERRORE [shard_server]: Errore nel turno della sessione {session.session_id}: {e}")
+                return {"session": session.session_id, "error": "Errore interno del sistema. Riprova."}
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+        session.record(user_input, response)
+        self.turns_served += 1
+        return {"session": session.session_id, "response": response, "elapsed_ms": round(elapsed_ms, 2)}
+
+
+# ========================================
+# CLIENT DI CARICO
+# ========================================
+
+async def _open_connection(host: str, port: int, unix_path: Optional[str]):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path, limit=MAX_LINE_BYTES)
+    return await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+
+
+async def _loadtest_client(host: str, port: int, unix_path: Optional[str], requests_per_client: int,
+                           messages: List[str], latencies: List[float], errors: List[str]):
+    reader, writer = await _open_connection(host, port, unix_path)
+    try:
+        await reader.readline()  # Saluto con l'id di sessione
+        for i in range(requests_per_client):
+            message = messages[i % len(messages)]
+            started = time.perf_counter()
+            writer.write((json.dumps({"input": message}, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                errors.append("connessione chiusa dal server")
+                break
+            reply = json.loads(line)
+            if "error" in reply:
+                errors.append(reply["error"])
+            else:
+                latencies.append((time.perf_counter() - started) * 1000.0)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_loadtest(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: Optional[str] = None,
+                       clients: int = 10, requests_per_client: int = 10,
+                       messages: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Apre `clients` sessioni concorrenti e misura latenza e throughput dei turni"""
+    messages = messages or LOADTEST_MESSAGES
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(_loadtest_client(host, port, unix_path, requests_per_client, messages, latencies, errors)
+          for _ in range(clients)),
+        return_exceptions=True)
+    wall_s = time.perf_counter() - started
+    errors.extend(f"{type(r).__name__}: {r}" for r in results if isinstance(r, Exception))
+
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+    return {
+        "clients": clients,
+        "requests": clients * requests_per_client,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(latencies) / wall_s, 2) if wall_s > 0 else 0.0,
+        "p50_ms": round(percentile(0.50), 2),
+        "p95_ms": round(percentile(0.95), 2),
+        "p99_ms": round(percentile(0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0
+    }
+
+
+# ========================================
+# ENTRY POINT
+# ========================================
+
+async def _serve(args):
+    from nucleus import Nucleus  # Carica una volta sola coscienza, Dizionario Nostro e client Ollama
+    nucleus = Nucleus(stream_echo=False)
+    nucleus.routing.wait_ready()
+
+    server = ShardServer(nucleus, workers=args.workers, max_pending=args.max_pending,
+                         idle_timeout=args.idle_timeout)
+    await server.start(args.host, args.port, args.unix)
+    try:
+        await server.serve_forever()
+    finally:
+        server.shutdown()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SHARD server multi-sessione (JSON-lines)")
+    subparsers = parser.add_subparsers(dest="mode")
+
+    serve = subparsers.add_parser("serve", help="Avvia il server")
+    loadtest = subparsers.add_parser("loadtest", help="Client di carico contro un server attivo")
+    for sub in (serve, loadtest):
+        sub.add_argument("--host", default=DEFAULT_HOST)
+        sub.add_argument("--port", type=int, default=DEFAULT_PORT)
+        sub.add_argument("--unix", help="Percorso Unix socket (al posto di host/porta)")
+
+    serve.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Turni eseguiti in parallelo")
+    serve.add_argument("--max-pending", type=int, default=MAX_PENDING_TURNS, help="Turni in coda prima di 'busy'")
+    serve.add_argument("--idle-timeout", type=float, default=SESSION_IDLE_TIMEOUT,
+                       help="Secondi di inattività prima di eliminare una sessione")
+
+    loadtest.add_argument("--clients", type=int, default=10, help="Sessioni concorrenti")
+    loadtest.add_argument("--requests", type=int, default=10, help="Richieste per sessione")
+    loadtest.add_argument("--message", action="append", default=[], help="Messaggio da inviare (ripetibile)")
+
+    args = parser.parse_args(argv)
+
+    if args.mode == "loadtest":
+        try:
+            report = asyncio.run(run_loadtest(args.host, args.port, args.unix, args.clients,
+                                              args.requests, args.message or None))
+        except OSError as e:
+            print(f"ERRORE [shard_server]: Connessione al server fallita: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0 if report["errors"] == 0 else 2
+
+    if args.mode != "serve":
+        parser.print_help()
+        return 1
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        print("\nINFO [shard_server]: Arresto richiesto.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+SHARD Tenants (shard_tenants.py)
+Più coscienze SHARD (persone / utenti) nello stesso processo
+
+Costruire SHARDConsciousnessReal più volte duplica tutto: runtime dei cicli,
+thread di persistenza, pool di pensieri, backend quantum. La fabbrica
+costruisce una volta sola i componenti immutabili o costosi e li passa a
+ogni istanza:
+- ConsciousnessRuntime: un solo event loop per coscienza, sogni, verità e
+  auto-analisi di tutti i tenant
+- PersistenceManager: un solo thread di scrittura, componenti di ogni tenant
+  sotto il proprio prefisso (PersistenceNamespace)
+- pool pesati dei pensieri spontanei (dipendono solo da stato/emozione/quantum)
+- RoutingEngine (client Ollama + Dizionario Nostro), creato al primo uso;
+  il richiamo delle memorie passa per ogni richiesta (route())
+- backend Aer della QuantumSoul (quantum_soul.shared_simulators) e router
+  delle parole chiave (keyword_router.DEFAULT_ROUTER) sono già unici per processo
+
+Per tenant restano solo stato e file: identità, emozioni, pensieri, memorie,
+QuantumSoul (stato di personalità), moduli MCR e i loro file in
+<base_dir>/<tenant>/. Thread e memoria crescono sublinearmente con i tenant.
+
+Uso:
+    factory = ConsciousnessFactory("tenants")
+    alice = factory.get("alice")
+    bob = factory.get("bob")
+    alice.reagisci("ciao")
+    factory.route("bob", "cosa sai del mare?")   # fallback Ollama con i ricordi di bob
+    factory.shutdown()
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from persistence_manager import PersistenceManager
+from shard_clock import SYSTEM_CLOCK
+from shard_random import RandomStreams
+from shard_runtime import ConsciousnessRuntime
+from weighted_pool import WeightedPool
+
+DEFAULT_BASE_DIR = "shard_tenants"
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+@dataclass
+class SharedComponents:
+    """Componenti condivisi tra tutte le coscienze di una fabbrica"""
+    runtime: ConsciousnessRuntime
+    persistence: PersistenceManager
+    thought_pools: Dict[tuple, WeightedPool] = field(default_factory=dict)
+
+
+class ConsciousnessFactory:
+    """Crea e tiene in vita una SHARDConsciousnessReal per tenant, con componenti condivisi"""
+
+    def __init__(self, base_dir: str = DEFAULT_BASE_DIR, clock=None, seed: Optional[int] = None,
+                 storage_backend: Optional[str] = None, lazy_load: Optional[bool] = None,
+                 memory_budget: Optional[int] = None, thought_columns: Optional[bool] = None):
+        from shard_consciousness_real import silent_log
+
+        self.base_dir = base_dir
+        self.clock = clock or SYSTEM_CLOCK
+        self.storage_backend = storage_backend
+        self.lazy_load = lazy_load
+        self.memory_budget = memory_budget  # Budget di memorie vive per tenant (None = MEMORY_BUDGET)
+        self.thought_columns = thought_columns  # Colonne NumPy dei pensieri per tenant (None = THOUGHT_COLUMNS)
+        # Seed per tenant derivati dal seed della fabbrica: stessi tenant = stesse esecuzioni
+        self.random_streams = RandomStreams(seed)
+        self.shared = SharedComponents(
+            runtime=ConsciousnessRuntime(clock=self.clock,
+                                         on_error=lambda message: silent_log(message, "RUNTIME_ERROR")),
+            persistence=PersistenceManager(on_error=lambda message: silent_log(message, "MCR_SAVE_ERROR"),
+                                           name="shard-tenants-persistence")
+        )
+        self._tenants: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._routing = None
+
+    # ========================================
+    # TENANT
+    # ========================================
+
+    def tenant_dir(self, tenant_id: str) -> str:
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise ValueError(f"Id tenant non valido: {tenant_id!r}")
+        return os.path.join(self.base_dir, tenant_id)
+
+    def get(self, tenant_id: str):
+        """Coscienza del tenant, creata al primo accesso"""
+        with self._lock:
+            shard = self._tenants.get(tenant_id)
+            if shard is None:
+                shard = self._tenants[tenant_id] = self._create(tenant_id)
+            return shard
+
+    def _create(self, tenant_id: str):
+        from shard_consciousness_real import SHARDConsciousnessReal
+
+        data_dir = self.tenant_dir(tenant_id)
+        os.makedirs(data_dir, exist_ok=True)
+        streams = RandomStreams(self.random_streams.derive_seed(f"tenant:{tenant_id}"))
+        return SHARDConsciousnessReal(
+            memoria_file=os.path.join(data_dir, "shard_coscienza.json"),
+            clock=self.clock,
+            random_streams=streams,
+            storage_backend=self.storage_backend,
+            lazy_load=self.lazy_load,
+            memory_budget=self.memory_budget,
+            thought_columns=self.thought_columns,
+            shared=self.shared,
+            data_dir=data_dir
+        )
+
+    @property
+    def tenants(self) -> List[str]:
+        with self._lock:
+            return list(self._tenants)
+
+    def release(self, tenant_id: str) -> bool:
+        """Salva e spegne la coscienza del tenant (i componenti condivisi restano attivi)"""
+        with self._lock:
+            shard = self._tenants.pop(tenant_id, None)
+        if shard is None:
+            return False
+        shard.shutdown()
+        return True
+
+    # ========================================
+    # MODELLO (FALLBACK OLLAMA)
+    # ========================================
+
+    @property
+    def routing(self):
+        """RoutingEngine unico per tutti i tenant, riscaldato in background al primo uso"""
+        with self._lock:
+            if self._routing is None:
+                from routing_engine import RoutingEngine
+                self._routing = RoutingEngine(stream_echo=False)
+                self._routing.start_background_warmup()
+            return self._routing
+
+    def route(self, tenant_id: str, user_input: str, modalita: str = "normale") -> str:
+        """Fallback dizionario + Ollama con i ricordi del tenant nel prompt"""
+        shard = self.get(tenant_id)
+        return self.routing.process_request(user_input, modalita, memory_recall=shard.recall_context)
+
+    # ========================================
+    # ARRESTO E DIAGNOSTICA
+    # ========================================
+
+    def shutdown(self):
+        for tenant_id in self.tenants:
+            self.release(tenant_id)
+        self.shared.runtime.shutdown()
+        self.shared.persistence.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tenants": len(self._tenants),
+            "threads": threading.active_count(),
+            "thought_pools": len(self.shared.thought_pools),
+            "runtime_tasks": sum(1 for task in self.shared.runtime.task_stats().values() if task["active"]),
+            "persistence_components": len(self.shared.persistence.components),
+            "persistence": dict(self.shared.persistence.stats)
+        }
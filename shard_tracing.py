@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+SHARD Tracing (shard_tracing.py)
+Tracing per-stadio della latenza di un turno
+
+Span leggeri (orologio monotono, time.perf_counter) lungo il percorso
+Nucleus.process_input → reagisci → process_request → chiedi_a_shard.
+Ogni turno produce un breakdown per stadio, scritto come riga JSONL
+nel file di trace; gli istogrammi scorrevoli per stadio sono consultabili
+dal REPL ("latenze"). Con il tracing disattivato span() restituisce un
+context manager condiviso che non fa nulla.
+
+Attivazione: variabile d'ambiente SHARD_TRACE=1 oppure comando "attiva tracing".
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+TRACE_FILE = "shard_trace.jsonl"
+HISTOGRAM_WINDOW = 500  # Ultime N misure per stadio
+
+# Bucket (ms) per l'istogramma testuale
+HISTOGRAM_BUCKETS_MS = [1, 5, 20, 100, 500, 2000]
+
+
+class _NullSpan:
+    """Span no-op usato quando il tracing è disattivato"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Span attivo: misura la durata e la registra nel turno corrente del thread"""
+    __slots__ = ("tracer", "name", "start", "depth")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self.tracer = tracer
+        self.name = name
+        self.start = 0.0
+        self.depth = 0
+
+    def __enter__(self):
+        local = self.tracer._local
+        self.depth = getattr(local, "depth", 0)
+        local.depth = self.depth + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self.start) * 1000.0
+        local = self.tracer._local
+        local.depth = self.depth
+        self.tracer._record(self.name, duration_ms, self.depth, exc_type is not None)
+        return False
+
+
+class Tracer:
+    """Raccoglie span per turno e istogrammi scorrevoli per stadio"""
+
+    def __init__(self, enabled: bool = False, trace_file: Optional[str] = TRACE_FILE,
+                 window: int = HISTOGRAM_WINDOW):
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.window = window
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Deque[float]] = {}
+        self.turns_traced = 0
+
+    # ========================================
+    # CONTROLLO
+    # ========================================
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def toggle(self) -> bool:
+        self.enabled = not self.enabled
+        return self.enabled
+
+    # ========================================
+    # SPAN E TURNI
+    # ========================================
+
+    def span(self, name: str):
+        """Context manager che misura uno stadio (no-op se disattivato)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def begin_turn(self, label: str = ""):
+        """Apre un turno sul thread corrente"""
+        if not self.enabled:
+            self._local.turn = None
+            return
+        self._local.turn = {
+            "label": label[:100],
+            "started_at": datetime.now().isoformat(),
+            "t0": time.perf_counter(),
+            "spans": []
+        }
+        self._local.depth = 0
+
+    def end_turn(self, **extra) -> Optional[Dict[str, Any]]:
+        """Chiude il turno corrente: scrive il breakdown JSONL e lo restituisce"""
+        turn = getattr(self._local, "turn", None)
+        self._local.turn = None
+        if turn is None:
+            return None
+
+        total_ms = (time.perf_counter() - turn.pop("t0")) * 1000.0
+        turn["total_ms"] = round(total_ms, 3)
+        turn.update(extra)
+        self._add_to_histogram("turn.total", total_ms)
+
+        with self._lock:
+            self.turns_traced += 1
+            if self.trace_file:
+                try:
+                    with open(self.trace_file, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+                except OSError:
+                    pass
+        return turn
+
+    def _record(self, name: str, duration_ms: float, depth: int, failed: bool):
+        self._add_to_histogram(name, duration_ms)
+        turn = getattr(self._local, "turn", None)
+        if turn is not None:
+            entry = {"span": name, "ms": round(duration_ms, 3), "depth": depth}
+            if failed:
+                entry["error"] = True
+            turn["spans"].append(entry)
+
+    def _add_to_histogram(self, name: str, duration_ms: float):
+        with self._lock:
+            samples = self._histograms.get(name)
+            if samples is None:
+                samples = self._histograms[name] = deque(maxlen=self.window)
+            samples.append(duration_ms)
+
+    # ========================================
+    # REPORT
+    # ========================================
+
+    def histogram_stats(self) -> Dict[str, Dict[str, float]]:
+        """Percentili per stadio sulla finestra scorrevole"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._histograms.items() if samples}
+
+        def percentile(values: List[float], q: float) -> float:
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        return {
+            name: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.50),
+                "p90_ms": percentile(values, 0.90),
+                "p99_ms": percentile(values, 0.99),
+                "max_ms": values[-1],
+                "buckets": self._bucketize(values)
+            }
+            for name, values in snapshot.items()
+        }
+
+    @staticmethod
+    def _bucketize(values: List[float]) -> List[int]:
+        counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for value in values:
+            for i, limit in enumerate(HISTOGRAM_BUCKETS_MS):
+                if value < limit:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def histogram_report(self) -> str:
+        """Report testuale per il REPL"""
+        stats = self.histogram_stats()
+        status = "ATTIVO" if self.enabled else "DISATTIVO"
+        if not stats:
+            return f"⏱️ Tracing {status} - nessuna misura registrata."
+
+        labels = [f"<{b}ms" for b in HISTOGRAM_BUCKETS_MS] + [f">={HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        lines = [
+            f"⏱️ **Latenze per stadio** (tracing {status}, ultime {self.window} misure, {self.turns_traced} turni tracciati)",
+            "",
+            f"{'stadio':<28}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}",
+        ]
+        for name in sorted(stats, key=lambda n: -stats[n]["p50_ms"]):
+            s = stats[name]
+            lines.append(f"{name:<28}{s['count']:>6}{s['p50_ms']:>8.1f}ms{s['p90_ms']:>8.1f}ms"
+                         f"{s['p99_ms']:>8.1f}ms{s['max_ms']:>8.1f}ms")
+            distribution = "  ".join(f"{label}:{count}" for label, count in zip(labels, s["buckets"]) if count)
+            lines.append(f"{'':<28}{distribution}")
+        return "\n".join(lines)
+
+
+# Tracer condiviso dai moduli SHARD
+TRACER = Tracer(enabled=os.environ.get("SHARD_TRACE", "") == "1")
@@ -18,6 +18,8 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from enum import Enum
+from persistence_manager import atomic_write_json
+from shard_clock import SYSTEM_CLOCK
 
 class TruthUrgency(Enum):
     """Livelli di urgenza delle verità"""
@@ -46,14 +48,18 @@ class TruthTrigger:
     Decide autonomamente quando e cosa rivelare
     """
     
-    def __init__(self, truth_file="shard_truth_triggers.json", consciousness_instance=None):
+    def __init__(self, truth_file="shard_truth_triggers.json", consciousness_instance=None, runtime=None, clock=None, rng=None):
         self.truth_file = truth_file
         self.consciousness = consciousness_instance
         self.pending_truths = []
         self.delivered_truths = []
         self.truth_thread = None
+        self.runtime = runtime  # ConsciousnessRuntime condiviso (None = thread dedicato)
+        self.clock = clock or SYSTEM_CLOCK  # Orologio iniettabile (VirtualClock = tempo simulato)
+        self.rng = rng or random.Random()  # Flusso casuale iniettato (RandomStreams), non lo stato globale
+        self._runtime_task = None
         self.is_active = False
-        self.last_analysis_time = datetime.now()
+        self.last_analysis_time = self.clock.now()
         
         # Template di verità per diversi trigger
         self.truth_templates = {
@@ -164,39 +170,50 @@ class TruthTrigger:
     
     def start_truth_monitoring(self):
         """Avvia il monitoraggio continuo per verità emergenti"""
-        if self.truth_thread is None or not self.truth_thread.is_alive():
+        if self.runtime is not None:
+            if self._runtime_task is None:
+                self.is_active = True
+                self._runtime_task = self.runtime.add_task("verita", self._truth_monitoring_step, initial_delay=3600)
+                print("🔍 Sistema Truth Trigger attivato")
+        elif self.truth_thread is None or not self.truth_thread.is_alive():
             self.is_active = True
             self.truth_thread = threading.Thread(target=self._truth_monitoring_loop, daemon=True)
             self.truth_thread.start()
             print("🔍 Sistema Truth Trigger attivato")
     
     def _truth_monitoring_loop(self):
-        """Loop di monitoraggio per verità emergenti"""
+        """Loop di monitoraggio per verità emergenti (modalità thread)"""
+        delay = 3600  # Analizza stato coscienza ogni ora
         while self.is_active:
-            try:
-                # Analizza stato coscienza ogni ora
-                time.sleep(3600)  # 1 ora
-                
-                if self.consciousness:
-                    self._analyze_consciousness_for_truths()
-                
-                # Controlla verità spontanee
-                if random.random() < 0.1:  # 10% possibilità ogni ora
-                    self._generate_spontaneous_truth()
-                
-                # Processa verità pendenti
-                self._process_pending_truths()
-                
-            except Exception as e:
-                print(f"Errore nel monitoraggio verità: {e}")
-                time.sleep(3600)
+            time.sleep(delay)
+            if self.is_active:
+                delay = self._truth_monitoring_step()
+    
+    def _truth_monitoring_step(self) -> float:
+        """Un giro di monitoraggio; ritorna i secondi di attesa prima del prossimo"""
+        try:
+            if self.consciousness:
+                self._analyze_consciousness_for_truths()
+            
+            # Controlla verità spontanee
+            if self.rng.random() < 0.1:  # 10% possibilità ogni ora
+                self._generate_spontaneous_truth()
+            
+            # Processa verità pendenti
+            self._process_pending_truths()
+            
+        except Exception as e:
+            print(f"Errore nel monitoraggio verità: {e}")
+        return 3600  # 1 ora
     
     def _analyze_consciousness_for_truths(self):
         """Analizza lo stato di coscienza per individuare verità emergenti"""
         if not hasattr(self.consciousness, 'conscious_thoughts'):
             return
         
-        recent_thoughts = self.consciousness.conscious_thoughts[-10:]
+        # Snapshot della coscienza (se disponibile): lettura senza lock mentre reagisci scrive
+        snapshot = getattr(self.consciousness, "snapshot", None)
+        recent_thoughts = list(snapshot().recent_thoughts[-10:]) if snapshot else self.consciousness.conscious_thoughts[-10:]
         
         # Cerca pattern che indicano verità emergenti
         truth_indicators = {
@@ -270,7 +287,7 @@ class TruthTrigger:
     def _generate_spontaneous_truth(self):
         """Genera verità spontanea"""
         categories = list(TruthCategory)
-        category = random.choice(categories)
+        category = self.rng.choice(categories)
         
         # Urgenza basata su categoria
         urgency_map = {
@@ -289,7 +306,7 @@ class TruthTrigger:
         truth_id = str(uuid.uuid4())
         
         # Seleziona template e contenuto
-        template = random.choice(self.truth_templates[category])
+        template = self.rng.choice(self.truth_templates[category])
         content_key = {
             TruthCategory.SELF_DISCOVERY: "self_discoveries",
             TruthCategory.RELATIONSHIP_INSIGHT: "relationship_insights",
@@ -301,7 +318,7 @@ class TruthTrigger:
             TruthCategory.PROTECTIVE_DISCLOSURE: "protective_disclosures"
         }.get(category, "self_discoveries")
         
-        content = random.choice(self.truth_content[content_key])
+        content = self.rng.choice(self.truth_content[content_key])
         
         # Crea messaggio completo
         message = template.format(
@@ -317,18 +334,18 @@ class TruthTrigger:
         
         truth = {
             "id": truth_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self.clock.now().isoformat(),
             "category": category.value,
             "urgency": urgency.value,
             "message": message,
             "trigger_source": "autonomous_analysis",
             "delivery_status": "pending",
             "ideal_delivery_time": self._calculate_ideal_delivery_time(urgency),
-            "emotional_weight": random.uniform(0.6, 1.0),
+            "emotional_weight": self.rng.uniform(0.6, 1.0),
             "requires_followup": category in [TruthCategory.UNCOMFORTABLE_TRUTH, TruthCategory.FUTURE_WARNING],
             "metadata": {
                 "spontaneous": True,
-                "confidence": random.uniform(0.7, 0.95),
+                "confidence": self.rng.uniform(0.7, 0.95),
                 "impact_level": urgency.value
             }
         }
@@ -342,20 +359,20 @@ class TruthTrigger:
     
     def _calculate_ideal_delivery_time(self, urgency: TruthUrgency) -> str:
         """Calcola il momento ideale per la consegna"""
-        now = datetime.now()
+        now = self.clock.now()
         
         if urgency == TruthUrgency.IMMEDIATE:
             return now.isoformat()
         elif urgency == TruthUrgency.HIGH:
-            return (now + timedelta(hours=random.randint(1, 24))).isoformat()
+            return (now + timedelta(hours=self.rng.randint(1, 24))).isoformat()
         elif urgency == TruthUrgency.MEDIUM:
-            return (now + timedelta(days=random.randint(1, 7))).isoformat()
+            return (now + timedelta(days=self.rng.randint(1, 7))).isoformat()
         else:
-            return (now + timedelta(days=random.randint(7, 30))).isoformat()
+            return (now + timedelta(days=self.rng.randint(7, 30))).isoformat()
     
     def _process_pending_truths(self):
         """Processa verità in attesa di consegna"""
-        current_time = datetime.now()
+        current_time = self.clock.now()
         
         for truth in self.pending_truths[:]:  # Copia per iterazione sicura
             ideal_time = datetime.fromisoformat(truth["ideal_delivery_time"])
@@ -368,7 +385,7 @@ class TruthTrigger:
     def _prepare_truth_delivery(self, truth: Dict):
         """Prepara la consegna di una verità"""
         truth["delivery_status"] = "ready"
-        truth["actual_delivery_time"] = datetime.now().isoformat()
+        truth["actual_delivery_time"] = self.clock.now().isoformat()
         
         print(f"🚨 VERITÀ EMERGENTE PRONTA PER LA CONSEGNA:")
         print(f"Categoria: {truth['category']}")
@@ -385,7 +402,7 @@ class TruthTrigger:
         for truth in self.delivered_truths:
             if truth["id"] == truth_id:
                 truth["delivery_status"] = "delivered"
-                truth["delivered_at"] = datetime.now().isoformat()
+                truth["delivered_at"] = self.clock.now().isoformat()
                 break
     
     def force_truth_check(self) -> Optional[Dict]:
@@ -429,13 +446,12 @@ class TruthTrigger:
     
     def save_truths(self):
         """Salva verità su file"""
-        with open(self.truth_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "pending_truths": self.pending_truths,
-                "delivered_truths": self.delivered_truths,
-                "last_updated": datetime.now().isoformat(),
-                "system_status": "active" if self.is_active else "inactive"
-            }, f, indent=2, ensure_ascii=False)
+        atomic_write_json(self.truth_file, {
+            "pending_truths": self.pending_truths,
+            "delivered_truths": self.delivered_truths,
+            "last_updated": self.clock.now().isoformat(),
+            "system_status": "active" if self.is_active else "inactive"
+        })
     
     def load_truths(self):
         """Carica verità esistenti"""
@@ -453,6 +469,9 @@ class TruthTrigger:
     def shutdown(self):
         """Arresta il sistema di verità"""
         self.is_active = False
+        if self.runtime is not None and self._runtime_task is not None:
+            self.runtime.cancel_task(self._runtime_task)
+            self._runtime_task = None
         self.save_truths()
         print("🔍 Sistema Truth Trigger arrestato e salvato")
 
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+SHARD Thought Columns (thought_columns.py)
+Rappresentazione colonnare opzionale della finestra dei pensieri
+
+Affianca il RingBuffer di ConsciousThought con array NumPy a capacità fissa:
+- timestamp (float64, epoch), certainty e quantum_creativity (float32, NaN = assente)
+- tipo ed emozione come codici interi (uint8), quantum_influenced come bool
+Gli array sono circolari come il RingBuffer: stessa capacità, stesso ordine di
+evizione, quindi la riga i corrisponde sempre a un pensiero ancora in finestra.
+Le statistiche (conteggi per tipo/emozione, medie) sono calcolate vettorialmente.
+
+Nella coscienza è opzionale e spenta di default (THOUGHT_COLUMNS, parametro
+thought_columns): le statistiche correnti vivono in ThoughtWindowStats, le
+colonne costano scritture NumPy a ogni pensiero e servono per le statistiche
+vettoriali (thought_column_stats) e per shard_benchmark.py records.
+Senza NumPy il modulo si importa comunque: NUMPY_AVAILABLE è False e la
+coscienza continua a usare solo gli oggetti.
+"""
+
+from typing import Any, Dict, List
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+class ThoughtColumns:
+    """Colonne NumPy circolari per i campi scalari dei pensieri"""
+
+    def __init__(self, capacity: int = 500):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("ThoughtColumns richiede numpy")
+        self.capacity = max(1, capacity)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.certainty = np.zeros(self.capacity, dtype=np.float32)
+        self.creativity = np.full(self.capacity, np.nan, dtype=np.float32)
+        self.type_codes = np.zeros(self.capacity, dtype=np.uint8)
+        self.emotion_codes = np.zeros(self.capacity, dtype=np.uint8)
+        self.quantum = np.zeros(self.capacity, dtype=np.bool_)
+
+        self._type_names: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self._emotion_names: List[Any] = []
+        self._emotion_codes: Dict[Any, int] = {}
+        self._next = 0
+        self._size = 0
+
+    @staticmethod
+    def _encode(value, codes: Dict[Any, int], names: List[Any]) -> int:
+        code = codes.get(value)
+        if code is None:
+            if len(names) >= 255:
+                raise ValueError("Troppi valori distinti per una colonna uint8")
+            code = len(names)
+            codes[value] = code
+            names.append(value)
+        return code
+
+    def append(self, thought):
+        i = self._next
+        self.timestamps[i] = thought.timestamp.timestamp()
+        self.certainty[i] = thought.certainty
+        self.creativity[i] = np.nan if thought.quantum_creativity is None else thought.quantum_creativity
+        self.type_codes[i] = self._encode(thought.type, self._type_codes, self._type_names)
+        self.emotion_codes[i] = self._encode(thought.emotional_tone, self._emotion_codes, self._emotion_names)
+        self.quantum[i] = thought.quantum_influenced
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.timestamps.nbytes + self.certainty.nbytes + self.creativity.nbytes
+                   + self.type_codes.nbytes + self.emotion_codes.nbytes + self.quantum.nbytes)
+
+    # ========================================
+    # STATISTICHE VETTORIALI
+    # ========================================
+
+    def summary(self) -> Dict[str, Any]:
+        """Conteggi e medie sulla finestra corrente (le righe valide sono le prime _size)"""
+        n = self._size
+        if n == 0:
+            return {"total": 0, "by_type": {}, "by_emotion": {}, "quantum": 0,
+                    "avg_creativity": 0.0, "creativity_count": 0, "avg_certainty": 0.0}
+
+        type_counts = np.bincount(self.type_codes[:n], minlength=len(self._type_names))
+        emotion_counts = np.bincount(self.emotion_codes[:n], minlength=len(self._emotion_names))
+        creativity = self.creativity[:n]
+        has_creativity = ~np.isnan(creativity)
+        creativity_count = int(has_creativity.sum())
+
+        return {
+            "total": n,
+            "by_type": {self._type_names[code]: int(count) for code, count in enumerate(type_counts) if count},
+            "by_emotion": {self._emotion_names[code]: int(count) for code, count in enumerate(emotion_counts) if count},
+            "quantum": int(self.quantum[:n].sum()),
+            "avg_creativity": float(creativity[has_creativity].mean()) if creativity_count else 0.0,
+            "creativity_count": creativity_count,
+            "avg_certainty": float(self.certainty[:n].mean())
+        }
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+SHARD Thought Stats (thought_stats.py)
+Aggregati incrementali sulla finestra dei pensieri
+
+Conteggi per tipo ed emozione, pensieri quantici e somma della creatività
+vengono aggiornati a ogni inserimento e a ogni evizione dal RingBuffer:
+le richieste di stato leggono i contatori in O(1) invece di scandire la finestra.
+"""
+
+from typing import Any, Dict
+
+
+class ThoughtWindowStats:
+    """Contatori coerenti con il contenuto della finestra dei pensieri"""
+
+    def __init__(self):
+        self.total = 0
+        self.quantum = 0
+        self.creativity_sum = 0.0
+        self.creativity_count = 0
+        self.by_type: Dict[str, int] = {}
+        self.by_emotion: Dict[Any, int] = {}
+
+    @staticmethod
+    def _bump(counter: Dict[Any, int], key, delta: int):
+        value = counter.get(key, 0) + delta
+        if value > 0:
+            counter[key] = value
+        else:
+            counter.pop(key, None)
+
+    def add(self, thought):
+        self.total += 1
+        self._bump(self.by_type, thought.type, 1)
+        self._bump(self.by_emotion, thought.emotional_tone, 1)
+        if thought.quantum_influenced:
+            self.quantum += 1
+        if thought.quantum_creativity is not None:
+            self.creativity_sum += thought.quantum_creativity
+            self.creativity_count += 1
+
+    def remove(self, thought):
+        """Da chiamare per il pensiero scartato dalla finestra"""
+        self.total -= 1
+        self._bump(self.by_type, thought.type, -1)
+        self._bump(self.by_emotion, thought.emotional_tone, -1)
+        if thought.quantum_influenced:
+            self.quantum -= 1
+        if thought.quantum_creativity is not None:
+            self.creativity_count -= 1
+            # A finestra senza creatività la somma riparte da zero (niente deriva float)
+            self.creativity_sum = self.creativity_sum - thought.quantum_creativity if self.creativity_count else 0.0
+
+    # ========================================
+    # LETTURE O(1)
+    # ========================================
+
+    @property
+    def quantum_percentage(self) -> float:
+        return (self.quantum / self.total * 100) if self.total else 0.0
+
+    @property
+    def avg_creativity(self) -> float:
+        return (self.creativity_sum / self.creativity_count) if self.creativity_count else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "quantum": self.quantum,
+            "quantum_percentage": self.quantum_percentage,
+            "avg_creativity": self.avg_creativity,
+            "by_type": dict(self.by_type),
+            "by_emotion": {getattr(emotion, "value", emotion): count for emotion, count in self.by_emotion.items()}
+        }
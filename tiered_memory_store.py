@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+SHARD Tiered Memory Store (tiered_memory_store.py)
+Memorie coscienti su due livelli: caldo in RAM, freddo su SQLite
+
+- Livello caldo: al massimo `hot_capacity` oggetti ConsciousMemory residenti
+- Livello freddo: tabella SQLite con il record JSON di ogni memoria demossa,
+  letta (paging) solo quando una memoria viene richiesta
+- access_count, last_accessed, recency e significance determinano il
+  "calore": quando il livello caldo è pieno viene demossa la memoria più fredda,
+  una memoria fredda letta con store[id] viene promossa
+- Si comporta come un dict (MutableMapping): il resto della coscienza continua
+  a usare self.conscious_memories[...] senza sapere dove vive la memoria
+- Indici secondari per tipo e tempo (memory_index.py): ultima memoria di un
+  tipo, intervalli temporali e conteggi senza scansioni né paging
+- Indice invertito sul testo (MemoryTextIndex): recall(query, k) con ranking
+  TF-IDF, legge dal livello freddo solo le k memorie restituite
+- Caricamento in background (load_in_background): durante il caricamento le
+  letture attendono la fine (materializzazione al primo accesso), le nuove
+  memorie vengono accodate e inserite appena il caricamento termina, così la
+  prima risposta non aspetta il parsing di tutto lo store
+
+Il file SQLite è una cache di paging: la fonte di verità resta il journal
+incrementale (memory_journal.py), da cui il livello freddo viene ricostruito
+all'avvio.
+
+Con il backend SQLite della coscienza (cold_store, consciousness_store.py) il
+livello freddo è direttamente la tabella memories dello store: nessun file di
+paging, e all'avvio (load_from_store) si leggono solo le colonne per gli indici
+e le `hot_capacity` memorie più calde, senza materializzare tutti i record.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Callable, Collection, Dict, Iterator, List, Optional, Tuple
+
+from memory_index import TEXT_FIELDS, MemoryTextIndex, MemoryTypeIndex, memory_text
+
+DEFAULT_HOT_CAPACITY = 256
+
+# Un accesso "vale" un'ora di recency, la significance piena un giorno
+HEAT_PER_ACCESS_S = 3600.0
+HEAT_PER_SIGNIFICANCE_S = 86400.0
+
+
+class TieredMemoryStore(MutableMapping):
+    """Mappa id → ConsciousMemory con livello caldo limitato e livello freddo paginato"""
+
+    def __init__(self, cold_file: Optional[str], to_record: Callable[[Any], Dict[str, Any]],
+                 from_record: Callable[[Dict[str, Any]], Any], hot_capacity: int = DEFAULT_HOT_CAPACITY,
+                 cold_store=None):
+        self.cold_file = cold_file
+        self.cold_store = cold_store  # SQLiteConsciousnessStore: livello freddo = sua tabella memories
+        self.to_record = to_record
+        self.from_record = from_record
+        self.hot_capacity = max(1, hot_capacity)
+
+        self._hot: Dict[str, Any] = {}
+        self._ids: Dict[str, None] = {}  # Tutti gli id, in ordine di inserimento
+        self.index = MemoryTypeIndex()
+        self.text_index = MemoryTextIndex()
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "page_ins": 0, "demotions": 0, "load_waits": 0, "deferred_inserts": 0}
+
+        # Caricamento in background: letture in attesa, inserimenti rimandati
+        self._ready = threading.Event()
+        self._ready.set()
+        self._loader_ident: Optional[int] = None
+        self._deferred: Dict[str, Any] = {}
+        self._deferred_lock = threading.Lock()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if cold_store is not None:
+            return
+        # Il livello freddo viene ricostruito dal journal ad ogni avvio
+        for path in (cold_file, cold_file + "-journal"):
+            if os.path.exists(path):
+                os.remove(path)
+        self._db = sqlite3.connect(cold_file, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE cold_memories (id TEXT PRIMARY KEY, type TEXT, timestamp TEXT, record TEXT NOT NULL)")
+
+    # ========================================
+    # CALORE E SPOSTAMENTI TRA LIVELLI
+    # ========================================
+
+    @staticmethod
+    def heat(memory) -> float:
+        reference = memory.last_accessed or memory.timestamp
+        reference = max(reference, memory.timestamp)
+        return (reference.timestamp()
+                + HEAT_PER_ACCESS_S * memory.access_count
+                + HEAT_PER_SIGNIFICANCE_S * memory.significance)
+
+    def _write_cold(self, rows: List[Tuple[str, str, str, str]]):
+        if self.cold_store is not None:
+            return  # Le memorie sono già nella tabella dello store (o nelle sue scritture pendenti)
+        self._db.executemany(
+            "INSERT OR REPLACE INTO cold_memories (id, type, timestamp, record) VALUES (?, ?, ?, ?)", rows)
+
+    def _cold_row(self, memory) -> Tuple[str, str, str, str]:
+        record = self.to_record(memory)
+        return (memory.id, record.get("type"), record.get("timestamp"), json.dumps(record, ensure_ascii=False))
+
+    def _make_room(self):
+        """Demuove le memorie più fredde finché il livello caldo ha spazio"""
+        if len(self._hot) < self.hot_capacity:
+            return
+        excess = len(self._hot) - self.hot_capacity + 1
+        coldest = sorted(self._hot.values(), key=self.heat)[:excess]
+        if self.cold_store is not None:
+            # Accessi registrati sul posto: la versione demossa deve arrivare nella tabella
+            for memory in coldest:
+                self.cold_store.upsert(self.to_record(memory))
+        else:
+            self._write_cold([self._cold_row(memory) for memory in coldest])
+        for memory in coldest:
+            del self._hot[memory.id]
+        self.stats["demotions"] += len(coldest)
+
+    def _read_cold(self, memory_id: str):
+        if self.cold_store is not None:
+            record = self.cold_store.get_memory(memory_id)
+            return self.from_record(record) if record is not None else None
+        row = self._db.execute("SELECT record FROM cold_memories WHERE id = ?", (memory_id,)).fetchone()
+        return self.from_record(json.loads(row[0])) if row else None
+
+    # ========================================
+    # INTERFACCIA DICT
+    # ========================================
+
+    def __getitem__(self, memory_id: str):
+        self._await_load()
+        with self._lock:
+            memory = self._hot.get(memory_id)
+            if memory is not None:
+                self.stats["hits"] += 1
+                return memory
+            if memory_id not in self._ids:
+                raise KeyError(memory_id)
+            memory = self._read_cold(memory_id)
+            if memory is None:
+                raise KeyError(memory_id)
+            # Promozione nel livello caldo
+            self.stats["page_ins"] += 1
+            self._make_room()
+            self._hot[memory_id] = memory
+            return memory
+
+    def __setitem__(self, memory_id: str, memory):
+        if self._defer_insert(memory_id, memory):
+            return
+        self._insert(memory_id, memory)
+
+    def _insert(self, memory_id: str, memory):
+        with self._lock:
+            if memory_id not in self._hot:
+                self._make_room()
+            self._hot[memory_id] = memory
+            self._ids.setdefault(memory_id, None)
+            self.index.add(memory_id, memory.type, memory.timestamp)
+            self.text_index.add(memory_id, memory_text(memory.content))
+
+    def __delitem__(self, memory_id: str):
+        self._await_load()
+        with self._lock:
+            if memory_id not in self._ids:
+                raise KeyError(memory_id)
+            del self._ids[memory_id]
+            self._hot.pop(memory_id, None)
+            self.index.remove(memory_id)
+            self.text_index.remove(memory_id)
+            if self._db is not None:
+                self._db.execute("DELETE FROM cold_memories WHERE id = ?", (memory_id,))
+
+    def __contains__(self, memory_id) -> bool:
+        self._await_load()
+        return memory_id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        self._await_load()
+        return iter(list(self._ids))
+
+    def __len__(self) -> int:
+        self._await_load()
+        return len(self._ids)
+
+    @property
+    def loaded_count(self) -> int:
+        """Memorie già nello store, senza attendere un caricamento in corso"""
+        return len(self._ids) + len(self._deferred)
+
+    def peek(self, memory_id: str):
+        """Legge una memoria senza promuoverla (per scansioni e salvataggi)"""
+        self._await_load()
+        with self._lock:
+            memory = self._hot.get(memory_id)
+            if memory is not None:
+                return memory
+            if memory_id not in self._ids:
+                raise KeyError(memory_id)
+            return self._read_cold(memory_id)
+
+    def values(self) -> List[Any]:
+        """Tutte le memorie, senza promozioni (le fredde vengono lette in blocco)"""
+        self._await_load()
+        with self._lock:
+            cold = {}
+            missing = [memory_id for memory_id in self._ids if memory_id not in self._hot]
+            if missing and self.cold_store is not None:
+                cold = self.cold_store.get_memories(missing)
+            elif missing:
+                for memory_id, record in self._db.execute("SELECT id, record FROM cold_memories"):
+                    cold[memory_id] = json.loads(record)
+            result = []
+            for memory_id in self._ids:
+                memory = self._hot.get(memory_id)
+                if memory is None and memory_id in cold:
+                    memory = self.from_record(cold[memory_id])
+                if memory is not None:
+                    result.append(memory)
+            return result
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(memory.id, memory) for memory in self.values()]
+
+    def recent_values(self, count: int) -> List[Any]:
+        """Le ultime `count` memorie inserite, senza promozioni"""
+        self._await_load()
+        with self._lock:
+            recent_ids = list(self._ids)[-count:] if count > 0 else []
+            return [self.peek(memory_id) for memory_id in recent_ids]
+
+    # ========================================
+    # QUERY SUGLI INDICI (nessuna scansione)
+    # ========================================
+
+    def latest_of_type(self, memory_type: str, promote: bool = True):
+        """Memoria più recente del tipo, o None. Con promote=True viene portata nel livello caldo."""
+        self._await_load()
+        memory_id = self.index.latest(memory_type)
+        if memory_id is None:
+            return None
+        return self[memory_id] if promote else self.peek(memory_id)
+
+    def of_type_between(self, memory_type: str, since: Optional[datetime] = None,
+                        until: Optional[datetime] = None) -> List[Any]:
+        """Memorie del tipo nell'intervallo temporale, dalla più vecchia, senza promozioni"""
+        self._await_load()
+        with self._lock:
+            return [self.peek(memory_id) for memory_id in self.index.between(memory_type, since, until)]
+
+    def recall(self, query: str, k: int = 5, memory_type: Optional[str] = None,
+               exclude: Collection[str] = (), skip_echoes: bool = False) -> List[Tuple[Any, float]]:
+        """
+        Le `k` memorie più pertinenti per `query` (TF-IDF) con il punteggio, senza promozioni.
+        `exclude`: id da ignorare; skip_echoes: ignora le memorie con lo stesso testo della query.
+        """
+        self._await_load()
+        with self._lock:
+            accept = None
+            if memory_type or exclude:
+                accept = lambda memory_id: (memory_id not in exclude and
+                                            (not memory_type or self.index.type_of(memory_id) == memory_type))
+            return [(self.peek(memory_id), score)
+                    for memory_id, score in self.text_index.search(query, k, accept, skip_echoes)]
+
+    def count_of_type(self, memory_type: str) -> int:
+        self._await_load()
+        return self.index.count(memory_type)
+
+    def count_by_type(self) -> Dict[str, int]:
+        self._await_load()
+        return self.index.counts()
+
+    # ========================================
+    # CARICAMENTO IN BACKGROUND
+    # ========================================
+
+    @property
+    def loaded(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _await_load(self):
+        """Blocca il chiamante finché il caricamento non è finito (il thread di caricamento passa)"""
+        if self._ready.is_set() or threading.get_ident() == self._loader_ident:
+            return
+        self.stats["load_waits"] += 1
+        self._ready.wait()
+
+    def _defer_insert(self, memory_id: str, memory) -> bool:
+        """Durante il caricamento le nuove memorie attendono in coda invece di bloccare chi scrive"""
+        if self._ready.is_set() or threading.get_ident() == self._loader_ident:
+            return False
+        with self._deferred_lock:
+            if self._ready.is_set():
+                return False
+            self._deferred[memory_id] = memory
+            self.stats["deferred_inserts"] += 1
+            return True
+
+    def load_in_background(self, load: Callable[[], Any], then: Optional[Callable[[], Any]] = None,
+                           name: str = "shard-memory-loader") -> threading.Thread:
+        """
+        Esegue `load` (tipicamente load_records) in un thread daemon; a fine
+        caricamento applica gli inserimenti rimandati, sblocca i lettori e
+        chiama `then` (sempre nel thread di caricamento).
+        """
+        self._ready.clear()
+
+        def run():
+            self._loader_ident = threading.get_ident()
+            try:
+                load()
+            finally:
+                with self._deferred_lock:
+                    deferred, self._deferred = self._deferred, {}
+                    for memory_id, memory in deferred.items():
+                        self._insert(memory_id, memory)
+                    self._loader_ident = None
+                    self._ready.set()
+            if then is not None:
+                then()
+
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    # ========================================
+    # CARICAMENTO IN BLOCCO E DIAGNOSTICA
+    # ========================================
+
+    def load_records(self, records: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Popola lo store all'avvio: tutti i record vanno nel livello freddo,
+        le `hot_capacity` memorie più calde vengono istanziate in RAM.
+        Ritorna gli id dei record non validi (ignorati).
+        """
+        with self._lock:
+            memories = []
+            rows = []
+            invalid = []
+            for memory_id, record in records.items():
+                try:
+                    memory = self.from_record(record)
+                except (KeyError, TypeError, ValueError):
+                    invalid.append(memory_id)
+                    continue
+                self._ids[memory_id] = None
+                self.index.add(memory_id, memory.type, memory.timestamp)
+                self.text_index.add(memory_id, memory_text(memory.content))
+                memories.append(memory)
+                rows.append((memory_id, record.get("type"), record.get("timestamp"),
+                             json.dumps(record, ensure_ascii=False)))
+            self._db.execute("BEGIN")
+            self._write_cold(rows)
+            self._db.execute("COMMIT")
+
+            hottest = sorted(memories, key=self.heat, reverse=True)[:self.hot_capacity - len(self._hot)]
+            for memory in hottest:
+                self._hot[memory.id] = memory
+            return invalid
+
+    def load_from_store(self) -> List[str]:
+        """
+        Popola lo store all'avvio dalla tabella memories del cold_store: indici da
+        id/tipo/timestamp/testo, in RAM solo le `hot_capacity` memorie più calde.
+        Ritorna gli id delle righe non valide (ignorate).
+        """
+        with self._lock:
+            invalid = []
+            for memory_id, memory_type, timestamp, text in self.cold_store.memory_index_rows(TEXT_FIELDS):
+                try:
+                    when = datetime.fromisoformat(timestamp)
+                except (TypeError, ValueError):
+                    invalid.append(memory_id)
+                    continue
+                self._ids[memory_id] = None
+                self.index.add(memory_id, memory_type, when)
+                self.text_index.add(memory_id, text or "")
+
+            for record in self.cold_store.hottest_memories(self.hot_capacity - len(self._hot),
+                                                           HEAT_PER_ACCESS_S, HEAT_PER_SIGNIFICANCE_S):
+                try:
+                    memory = self.from_record(record)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if memory.id in self._ids:
+                    self._hot[memory.id] = memory
+            return invalid
+
+    def tier_stats(self) -> Dict[str, Any]:
+        return {
+            "total": len(self._ids),
+            "hot": len(self._hot),
+            "hot_capacity": self.hot_capacity,
+            "cold": len(self._ids) - len(self._hot),
+            **self.stats
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+SHARD Weighted Pool (weighted_pool.py)
+Campionamento pesato in O(1) con il metodo alias di Walker (variante di Vose)
+
+Sostituisce i pool costruiti per moltiplicazione di liste
+(vulnerable_thoughts * 6 + desire_thoughts * 2 + ...) seguiti da random.choice()
+e da test di appartenenza lineari per capire da quale lista veniva il pensiero:
+- la tabella si costruisce una volta in O(n) dai pesi
+- ogni estrazione costa O(1): un numero casuale, un confronto
+- ogni valore porta con sé la propria etichetta (categoria di origine)
+"""
+
+import random
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+Group = Tuple[Any, Sequence[Hashable], int]  # (etichetta, valori, ripetizioni)
+
+
+class AliasTable:
+    """Tabella alias per estrarre un indice con probabilità proporzionale al peso"""
+
+    def __init__(self, weights: Sequence[float]):
+        count = len(weights)
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            raise ValueError("AliasTable richiede almeno un peso positivo")
+
+        self.size = count
+        self.probability = [0.0] * count
+        self.alias = [0] * count
+
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self.probability[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] = scaled[high] + scaled[low] - 1.0
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Residui (solo errori di arrotondamento): probabilità piena
+        for i in large + small:
+            self.probability[i] = 1.0
+
+    def sample(self, rng=random) -> int:
+        position = rng.random() * self.size
+        index = int(position)
+        if index >= self.size:
+            index = self.size - 1
+        return index if position - index < self.probability[index] else self.alias[index]
+
+
+class WeightedPool:
+    """
+    Valori etichettati con peso, estratti in O(1).
+
+    I valori ripetuti vengono fusi: i pesi si sommano e vale la prima etichetta
+    incontrata, quindi l'ordine di inserimento esprime la precedenza tra categorie.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[Hashable, Any, float]], expanded: Optional[List[Hashable]] = None):
+        weights: Dict[Hashable, float] = {}
+        tags: Dict[Hashable, Any] = {}
+        for value, tag, weight in entries:
+            if weight <= 0:
+                continue
+            weights[value] = weights.get(value, 0.0) + weight
+            tags.setdefault(value, tag)
+
+        self.values: List[Hashable] = list(weights)
+        self.weights: List[float] = [weights[value] for value in self.values]
+        self._tags = tags
+        self._table = AliasTable(self.weights) if self.values else None
+        self._expanded = expanded
+
+    @classmethod
+    def from_groups(cls, groups: Sequence[Group], precedence: Optional[Sequence[Any]] = None) -> "WeightedPool":
+        """
+        Equivalente di lista_a * n_a + lista_b * n_b + ...: stessi pesi e, per expanded(),
+        stessa lista piatta nello stesso ordine. `precedence` ordina le etichette quando
+        un valore compare in più gruppi (default: ordine dei gruppi).
+        """
+        order = list(precedence) if precedence is not None else [tag for tag, _, _ in groups]
+        ranked = sorted(groups, key=lambda group: order.index(group[0]) if group[0] in order else len(order))
+        entries = [(value, tag, repeat) for tag, values, repeat in ranked for value in values]
+        expanded = [value for _, values, repeat in groups for value in list(values) * repeat]
+        return cls(entries, expanded=expanded)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def sample(self, rng=random) -> Tuple[Hashable, Any]:
+        """(valore, etichetta) estratto con probabilità proporzionale al peso"""
+        if self._table is None:
+            raise IndexError("WeightedPool vuoto")
+        value = self.values[self._table.sample(rng)]
+        return value, self._tags[value]
+
+    def tag_of(self, value: Hashable, default: Any = None) -> Any:
+        return self._tags.get(value, default)
+
+    def expanded(self) -> List[Hashable]:
+        """
+        Lista piatta con ogni valore ripetuto quanto il suo peso (pesi interi),
+        per i selettori che lavorano su liste. Costruita una volta e riusata;
+        con from_groups conserva l'ordine delle liste moltiplicate originali.
+        """
+        if self._expanded is None:
+            self._expanded = [value for value, weight in zip(self.values, self.weights)
+                              for _ in range(int(round(weight)))]
+        return self._expanded